@@ -0,0 +1,108 @@
+import json
+import os
+import time
+
+from openai.types.responses import Response
+
+BATCH_ENDPOINT = "/v1/responses"
+
+# The Batch API accepts at most 50,000 requests per input file
+MAX_REQUESTS_PER_BATCH = 50_000
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def write_batch_files(requests, directory, prefix):
+    """
+    Write (custom_id, body) pairs to one or more JSONL batch input files.
+    Returns the paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for start in range(0, len(requests), MAX_REQUESTS_PER_BATCH):
+        path = os.path.join(directory, f"{prefix}_{len(paths):03d}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, body in requests[start : start + MAX_REQUESTS_PER_BATCH]:
+                line = {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": body,
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+        paths.append(path)
+    return paths
+
+
+def submit_batch(client, path):
+    """
+    Upload a batch input file and start a batch for it. Returns the batch id.
+    """
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=BATCH_ENDPOINT,
+        completion_window="24h",
+    )
+    print(f"Submitted {path} as batch {batch.id}")
+    return batch.id
+
+
+def wait_for_batches(client, batch_ids, poll_interval=30):
+    """
+    Poll until every batch has finished. Returns the final batch objects.
+    """
+    finished = {}
+    while len(finished) < len(batch_ids):
+        for batch_id in batch_ids:
+            if batch_id in finished:
+                continue
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                finished[batch_id] = batch
+                print(f"Batch {batch_id} {batch.status}")
+        if len(finished) < len(batch_ids):
+            time.sleep(poll_interval)
+    return [finished[batch_id] for batch_id in batch_ids]
+
+
+def read_batch_results(client, batch):
+    """
+    Yield (custom_id, response) for each request in a finished batch, where
+    response is None if the request failed.
+    """
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        content = client.files.content(file_id).text
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            result = record.get("response") or {}
+            if record.get("error") or result.get("status_code") != 200:
+                print(f"Batch request {record['custom_id']} failed: {record}")
+                yield record["custom_id"], None
+                continue
+            yield record["custom_id"], Response.model_construct(**result["body"])
+
+
+def run_batches(client, requests_by_model, directory, poll_interval=30):
+    """
+    Submit one set of batch files per model (the Batch API only allows one
+    model per batch), wait for them and collect the responses.
+    Returns a dict mapping custom_id to its response, or None on failure.
+    """
+    batch_ids = []
+    for model, requests in requests_by_model.items():
+        if not requests:
+            continue
+        for path in write_batch_files(requests, directory, model):
+            batch_ids.append(submit_batch(client, path))
+
+    responses = {}
+    for batch in wait_for_batches(client, batch_ids, poll_interval):
+        for custom_id, response in read_batch_results(client, batch):
+            responses[custom_id] = response
+    return responses
@@ -0,0 +1,266 @@
+import argparse
+import csv
+import json
+import math
+import os
+import time
+
+# Columns of a call metrics row; times are in seconds
+METRIC_COLUMNS = [
+    "model",
+    "queue_wait",
+    "ttfb",
+    "latency",
+    "total_time",
+    "input_tokens",
+    "output_tokens",
+    "tokens_per_second",
+    "retries",
+]
+
+# Suffix of the metrics file written next to an extraction output file
+METRICS_SUFFIX = "_metrics.jsonl"
+
+
+class CallTimer:
+    """
+    Times one LLM call from the moment it is queued.
+
+    Call `attempt()` as each attempt is sent, `first_byte()` when the first
+    output arrives (if the call is streamed) and `finish()` with the token
+    counts once it completes. Queue wait runs until the first attempt is
+    sent, so it covers waiting for a worker, a semaphore or the rate limiter;
+    latency covers the final attempt only and total time everything.
+    """
+
+    def __init__(self, model, queued=None):
+        self.model = model
+        self.queued = queued if queued is not None else time.perf_counter()
+        self.first_sent = None
+        self.sent = None
+        self.first_output = None
+        self.finished = None
+        self.attempts = 0
+        self.input_tokens = None
+        self.output_tokens = None
+
+    def attempt(self):
+        self.sent = time.perf_counter()
+        if self.first_sent is None:
+            self.first_sent = self.sent
+        self.first_output = None
+        self.finished = None
+        self.attempts += 1
+
+    def first_byte(self):
+        if self.first_output is None:
+            self.first_output = time.perf_counter()
+
+    def finish(self, input_tokens=None, output_tokens=None, ttfb=None):
+        """
+        Mark the call complete. A `ttfb` reported by the server (in seconds
+        from sending) stands in for one observed through `first_byte()`.
+        """
+        self.finished = time.perf_counter()
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        if ttfb is not None and self.first_output is None:
+            self.first_output = self.sent + ttfb
+
+    def row(self, **extra):
+        """
+        The call's metrics as a row of METRIC_COLUMNS, plus `extra` fields.
+        """
+        latency = self.finished - self.sent
+        generating = latency
+        if self.first_output is not None:
+            generating = self.finished - self.first_output
+        tokens_per_second = None
+        if self.output_tokens and generating > 0:
+            tokens_per_second = round(self.output_tokens / generating, 2)
+        return {
+            "model": self.model,
+            "queue_wait": round(self.first_sent - self.queued, 4),
+            "ttfb": (
+                round(self.first_output - self.sent, 4)
+                if self.first_output is not None
+                else None
+            ),
+            "latency": round(latency, 4),
+            "total_time": round(self.finished - self.queued, 4),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_second": tokens_per_second,
+            "retries": self.attempts - 1,
+            **extra,
+        }
+
+
+def metrics_path(output_file):
+    """
+    The metrics file kept next to an extraction output file.
+    """
+    return os.path.splitext(output_file)[0] + METRICS_SUFFIX
+
+
+def percentile(values, q):
+    """
+    The `q`th percentile of `values`, interpolating between ranks. Returns
+    None for no values.
+    """
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def number(value):
+    # CSV rows hold every value as text, with missing ones left blank
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def summarize_calls(rows, key="model"):
+    """
+    Summarize call metrics rows per `key`: call count, p50/p95/p99 latency,
+    median time to first byte and queue wait, output tokens per second of
+    generation, retries, calls that failed after their retries and, when the
+    rows carry it, total cost.
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(row[key], []).append(row)
+
+    summary = []
+    for name, group in groups.items():
+
+        def values(column):
+            return [
+                value
+                for value in (number(row.get(column)) for row in group)
+                if value is not None
+            ]
+
+        latency = values("latency")
+        output_tokens = sum(values("output_tokens"))
+        generation_time = sum(
+            tokens / rate
+            for tokens, rate in (
+                (number(row.get("output_tokens")), number(row.get("tokens_per_second")))
+                for row in group
+            )
+            if tokens and rate
+        )
+        costs = values("total_cost")
+        summary.append(
+            {
+                key: name,
+                "calls": len(group),
+                "latency_p50": percentile(latency, 50),
+                "latency_p95": percentile(latency, 95),
+                "latency_p99": percentile(latency, 99),
+                "ttfb_p50": percentile(values("ttfb"), 50),
+                "queue_wait_p50": percentile(values("queue_wait"), 50),
+                "queue_wait_p95": percentile(values("queue_wait"), 95),
+                "tokens_per_second": (
+                    output_tokens / generation_time if generation_time else None
+                ),
+                "retries": int(sum(values("retries"))),
+                "failed": sum(row.get("outcome") == "failed" for row in group),
+                "total_cost": sum(costs) if costs else None,
+            }
+        )
+    return summary
+
+
+def print_call_summary(summary, key="model"):
+    """
+    Print per-model latency percentiles and throughput.
+    """
+
+    def seconds(value):
+        return f"{value:8.2f}s" if value is not None else f"{'-':>9}"
+
+    print(
+        f"{key:<40} {'calls':>6} {'p50':>9} {'p95':>9} {'p99':>9} "
+        f"{'ttfb p50':>9} {'queue p50':>9} {'tok/s':>8} {'retries':>7} "
+        f"{'failed':>6}"
+    )
+    for row in summary:
+        rate = row["tokens_per_second"]
+        print(
+            f"{str(row[key]):<40} {row['calls']:>6} {seconds(row['latency_p50'])} "
+            f"{seconds(row['latency_p95'])} {seconds(row['latency_p99'])} "
+            f"{seconds(row['ttfb_p50'])} {seconds(row['queue_wait_p50'])} "
+            f"{rate if rate is not None else 0:>8.1f} {row['retries']:>7} "
+            f"{row['failed']:>6}"
+        )
+
+
+def load_calls(path):
+    """
+    Read call metrics rows from a CSV or JSON Lines file.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            return list(csv.DictReader(f))
+        rows = []
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                # A line left half-written by a crash
+                continue
+        return rows
+
+
+def write_speed_summary(metrics_files, output):
+    """
+    Summarize each extraction metrics file into one row of a speed CSV,
+    keyed by the output JSON filename the leaderboard shows.
+    """
+    rows = []
+    for path in metrics_files:
+        calls = load_calls(path)
+        if not calls:
+            continue
+        filename = os.path.basename(path).removesuffix(METRICS_SUFFIX) + ".json"
+        for call in calls:
+            call["JSON Filename"] = filename
+        rows.extend(summarize_calls(calls, key="JSON Filename"))
+
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        columns = list(rows[0]) if rows else ["JSON Filename"]
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Speed summary for {len(rows)} files saved to {output}")
+    return rows
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize per-call latency and throughput of extraction runs"
+    )
+    parser.add_argument(
+        "files", nargs="+", help="Call metrics files (CSV or JSON Lines)"
+    )
+    parser.add_argument(
+        "--output",
+        help="Write one row per file to this CSV, for the leaderboard's speed "
+        "columns, instead of printing a per-model summary",
+    )
+    args = parser.parse_args(argv)
+
+    if args.output:
+        write_speed_summary(args.files, args.output)
+        return
+    rows = [row for path in args.files for row in load_calls(path)]
+    print_call_summary(summarize_calls(rows))
+
+
+if __name__ == "__main__":
+    cli()
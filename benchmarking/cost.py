@@ -1,30 +1,40 @@
-def calculate_openai_cost(response):
+# Batch API requests are billed at half the standard rate
+BATCH_DISCOUNT = 0.5
+
+# OpenAI pricing per 1M tokens (as of recent pricing). Input tokens served
+# from the prompt cache are billed at the "cached_input" rate.
+MODEL_PRICING = {
+    "gpt-4.1-2025-04-14": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "gpt-4.1-mini-2025-04-14": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano-2025-04-14": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4.5-preview": {"input": 75.00, "cached_input": 37.50, "output": 150.00},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "o3": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+    "o4-mini": {"input": 1.10, "cached_input": 0.275, "output": 4.40},
+}
+
+
+def calculate_openai_cost(response, batch=False):
     """
     Calculate the total cost of an OpenAI API request from the response object.
 
     Args:
         response: OpenAI response object with usage information
+        batch: Whether the request went through the Batch API
 
     Returns:
-        dict: Contains model, input_tokens, output_tokens, input_cost, output_cost, total_cost
-    """
-    # OpenAI pricing per 1M tokens (as of recent pricing)
-    MODEL_PRICING = {
-        "gpt-4.1-2025-04-14": {"input": 2.00, "output": 8.00},
-        "gpt-4.1-mini-2025-04-14": {"input": 0.40, "output": 1.60},
-        "gpt-4.1-nano-2025-04-14": {"input": 0.10, "output": 0.40},
-        "gpt-4.5-preview": {"input": 75.00, "output": 150.00},
-        "gpt-4o": {"input": 2.50, "output": 10.00},
-        "gpt-4o-mini": {"input": 0.15, "output": 0.60},
-        "o3": {"input": 2.00, "output": 8.00},
-        "o4-mini": {"input": 1.10, "output": 4.40},
-    }
-
+        dict: Contains model, input_tokens, cached_tokens, output_tokens,
+        input_cost, output_cost, total_cost and cache_savings (what the
+        cached input tokens would have cost at the full input rate)
+    """
     # Extract information from response
     model = response.model
     usage = response.usage
     input_tokens = usage.input_tokens
     output_tokens = usage.output_tokens
+    details = getattr(usage, "input_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None) or 0
 
     # Get pricing for the model
     if model not in MODEL_PRICING:
@@ -33,15 +43,110 @@ def calculate_openai_cost(response):
     pricing = MODEL_PRICING[model]
 
     # Calculate costs (pricing is per 1M tokens)
-    input_cost = (input_tokens / 1_000_000) * pricing["input"]
+    uncached_cost = ((input_tokens - cached_tokens) / 1_000_000) * pricing["input"]
+    cached_cost = (cached_tokens / 1_000_000) * pricing["cached_input"]
+    input_cost = uncached_cost + cached_cost
     output_cost = (output_tokens / 1_000_000) * pricing["output"]
+    cache_savings = (cached_tokens / 1_000_000) * (
+        pricing["input"] - pricing["cached_input"]
+    )
+    if batch:
+        input_cost *= BATCH_DISCOUNT
+        output_cost *= BATCH_DISCOUNT
+        cache_savings *= BATCH_DISCOUNT
     total_cost = input_cost + output_cost
 
     return {
         "model": model,
         "input_tokens": input_tokens,
+        "cached_tokens": cached_tokens,
         "output_tokens": output_tokens,
         "input_cost": input_cost,
         "output_cost": output_cost,
         "total_cost": total_cost,
+        "cache_savings": cache_savings,
     }
+
+
+def estimate_cost(model, input_tokens, output_tokens, batch=False):
+    """
+    Estimate the cost of requests before they are made, at the full
+    (uncached) input rate.
+    """
+    if model not in MODEL_PRICING:
+        raise ValueError(f"Pricing not available for model: {model}")
+    pricing = MODEL_PRICING[model]
+    cost = (input_tokens / 1_000_000) * pricing["input"] + (
+        output_tokens / 1_000_000
+    ) * pricing["output"]
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+def estimate_usage_cost(model, input_tokens, output_tokens):
+    """
+    Cost of a request whose usage the API never reported, such as a stream
+    cancelled once its answer was complete, from locally counted tokens.
+    Returns the same fields as calculate_openai_cost, with no cached tokens.
+    """
+    if model not in MODEL_PRICING:
+        raise ValueError(f"Pricing not available for model: {model}")
+    pricing = MODEL_PRICING[model]
+    input_cost = (input_tokens / 1_000_000) * pricing["input"]
+    output_cost = (output_tokens / 1_000_000) * pricing["output"]
+    return {
+        "model": model,
+        "input_tokens": input_tokens,
+        "cached_tokens": 0,
+        "output_tokens": output_tokens,
+        "input_cost": input_cost,
+        "output_cost": output_cost,
+        "total_cost": input_cost + output_cost,
+        "cache_savings": 0.0,
+    }
+
+
+def summarize_prompt_cache(results):
+    """
+    Summarize prompt-cache use per model and prompt from inference rows
+    (dicts holding prompt_type plus the fields calculate_openai_cost returns).
+    Rows answered from the local response cache are skipped, since they
+    made no API request this run.
+
+    Returns:
+        list of dicts with model, prompt_type, requests, input_tokens,
+        cached_tokens, hit_ratio, total_cost and cache_savings
+    """
+    groups = {}
+    for row in results:
+        if row.get("cache_hit"):
+            continue
+        group = groups.setdefault(
+            (row["model"], row["prompt_type"]),
+            {
+                "requests": 0,
+                "input_tokens": 0,
+                "cached_tokens": 0,
+                "total_cost": 0.0,
+                "cache_savings": 0.0,
+            },
+        )
+        group["requests"] += 1
+        # Responses cached before cached-token accounting lack these fields
+        group["input_tokens"] += row["input_tokens"]
+        group["cached_tokens"] += row.get("cached_tokens", 0)
+        group["total_cost"] += row["total_cost"]
+        group["cache_savings"] += row.get("cache_savings", 0.0)
+
+    return [
+        {
+            "model": model,
+            "prompt_type": prompt_type,
+            **group,
+            "hit_ratio": (
+                group["cached_tokens"] / group["input_tokens"]
+                if group["input_tokens"]
+                else 0.0
+            ),
+        }
+        for (model, prompt_type), group in sorted(groups.items())
+    ]
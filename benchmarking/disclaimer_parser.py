@@ -0,0 +1,162 @@
+import re
+
+# "Paid for by" with the spacing and casing variants seen in the emails
+PAID_FOR_BY = re.compile(r"paid\s*for\s*by\s*(?:the\s+)?", re.IGNORECASE)
+
+# Where a committee name stops: a full stop (but not one ending an initial
+# such as "U.S." or "J." or an "Inc."), list punctuation, the markdown left
+# by the HTML conversion, brackets and line breaks. A comma before "Inc." or
+# "LLC" is part of the name.
+NAME_END = re.compile(
+    r"(?<!\binc)(?<!\bllc)(?<![\s.][a-z])\.(?:\s|$)|(?-i:(?<=[a-z])\.(?=[A-Z]))"
+    r"|,(?!\s*(?:inc|llc)\b)|\s-{2,}|\*|\||\(|\[|<|\n|$",
+    re.IGNORECASE,
+)
+
+# Text that commonly follows the name without punctuation between them,
+# either after a space or glued on by a lost line break ("CongressP.O. Box")
+TRAILERS = re.compile(
+    r"(?:\s+|(?<=[a-z])(?=[A-Z]))"
+    r"(?:and\s*not\s*authorized|not\s*authorized|authorized\s+by|contributions"
+    r"|don'?t\s*want|click|copyright|unsubscribe|p\.?\s*o\.?\s*box|www\.|https?:"
+    r"|(?!(?:19|20)\d\d\b)\d{2,}|to\s+(?:unsubscribe|opt\s*out|stop)|you\s+are\s+receiving"
+    r"|title\s+and\s+affiliation|privacy)",
+    re.IGNORECASE,
+)
+
+# A lowercase letter running into an uppercase one, usually two words whose
+# separating line break was lost ("BlackburnTennessee")
+GLUED = re.compile(r"[a-z][A-Z]")
+GLUED_FOR = re.compile(r"(?<=\w)(for)(?=\s)", re.IGNORECASE)
+
+# Words committee names usually end with
+NAME_ENDINGS = {
+    "action",
+    "america",
+    "committee",
+    "congress",
+    "fund",
+    "governor",
+    "inc",
+    "inc.",
+    "llc",
+    "pac",
+    "party",
+    "president",
+    "senate",
+    "victory",
+}
+
+# Confidence at or above which the pipeline skips the model
+DEFAULT_THRESHOLD = 0.8
+
+
+def strip_repeat(name):
+    """
+    Split off a second copy of the name, as in
+    "Maggie for Congress Maggie for Congress",
+    "ROB ORTT FOR STATE SENATE Ortt for State Senate" or
+    "Gay Valimont Gay Valimont For Congress", comparing letters only so that
+    copies with different spacing still match. Returns the fuller copy, or
+    None if the name does not repeat.
+    """
+    words = name.split()
+    for split in range(1, len(words)):
+        first = "".join(words[:split]).lower()
+        rest = "".join(words[split:]).lower()
+        if len(first) < 4 or len(rest) < 4:
+            continue
+        if rest.startswith(first):
+            return " ".join(words[split:] if len(rest) > len(first) else words[:split])
+        if rest.endswith(first) or first.endswith(rest):
+            return " ".join(words[:split])
+    return None
+
+
+def respace(name, body):
+    """
+    Restore word breaks lost at line breaks ("Huntfor Congress") using every
+    copy of `name` in `body`: a break found in any copy is kept.
+    """
+    letters = name.replace(" ", "")
+    if not letters:
+        return name
+    pattern = re.compile(
+        r"\s*".join(re.escape(char) for char in letters), re.IGNORECASE
+    )
+    breaks = set()
+    for match in pattern.finditer(body):
+        position = -1
+        for char in match.group():
+            if char.isspace():
+                breaks.add(position)
+            else:
+                position += 1
+    if not breaks:
+        return name
+    return "".join(
+        char + (" " if index in breaks else "") for index, char in enumerate(letters)
+    ).strip()
+
+
+def parse_disclaimer(text):
+    """
+    Pull the committee name out of the text following "Paid for by".
+    Returns (name, confidence) with confidence between 0 and 1.
+    """
+    end = NAME_END.search(text)
+    candidate = text[: end.start()].strip()
+    confidence = 0.7 if end.group() else 0.6
+
+    trailer = TRAILERS.search(candidate)
+    if trailer:
+        candidate = candidate[: trailer.start()].strip()
+        confidence -= 0.1
+
+    repeated = strip_repeat(candidate)
+    if repeated:
+        # Disclaimers that name the committee twice are reliable
+        candidate = repeated
+        confidence += 0.1
+
+    words = candidate.split()
+    if not 1 <= len(words) <= 10:
+        return candidate or None, 0.0
+    if words[-1].lower() in NAME_ENDINGS or (
+        len(words) >= 3 and words[-2].lower() == "for"
+    ):
+        confidence += 0.25
+    return candidate, min(confidence, 1.0)
+
+
+def extract_committee(body):
+    """
+    Extract the committee named in an email's "Paid for by" disclaimer without
+    calling a model.
+
+    Returns (committee, confidence). The confidence is high when the name is
+    cleanly delimited, looks like a committee name and every disclaimer in
+    the email agrees; it is 0 when there is no disclaimer to parse.
+    """
+    names = {}
+    for match in PAID_FOR_BY.finditer(body):
+        name, confidence = parse_disclaimer(body[match.end() : match.end() + 300])
+        if not name:
+            continue
+        name = respace(name, body)
+        # "for" glued to the word before it ("Huntfor", "MACKENZIEFOR")
+        name = GLUED_FOR.sub(r" \1", name)
+        if name.lower().startswith("the "):
+            name = name[4:]
+        if GLUED.search(name):
+            confidence -= 0.3
+        key = name.lower()
+        names[key] = max((confidence, name), names.get(key, (0.0, name)))
+    if not names:
+        return None, 0.0
+
+    confidence, name = max(names.values())
+    if len(names) > 1:
+        # Disclaimers naming different committees need a model to pick one
+        confidence *= 0.5
+    return name, max(confidence, 0.0)
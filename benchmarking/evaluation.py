@@ -1,15 +1,48 @@
+import argparse
 import asyncio
-import json
+import functools
+import time
 
 import pandas as pd
-from cost import calculate_openai_cost
+from batch import run_batches
+from call_metrics import (
+    METRIC_COLUMNS,
+    CallTimer,
+    load_calls,
+    print_call_summary,
+    summarize_calls,
+)
+from cost import (
+    calculate_openai_cost,
+    estimate_cost,
+    estimate_usage_cost,
+    summarize_prompt_cache,
+)
+from disclaimer_parser import DEFAULT_THRESHOLD, extract_committee
 from dotenv import load_dotenv
-from models import Newsletter
-from openai import AsyncOpenAI
+from models import (
+    CommitteeExtraction,
+    json_schema_format,
+    load_newsletters,
+    packed_model,
+)
+from openai import AsyncOpenAI, OpenAI
+from packing import (
+    PACK_INSTRUCTIONS,
+    PACK_TOKENS,
+    format_pack,
+    pack,
+    parse_pack,
+    split,
+)
+from pydantic import ValidationError
+from rate_limiter import RateLimiter
+from response_cache import ResponseCache
+from results_log import ResultsLog
+from stream_parser import FieldStream
+from token_budget import count_tokens, disclaimer_window, get_encoding
 from tqdm.asyncio import tqdm
 
-load_dotenv()
-
 # LLM setup
 models = [
     "gpt-4.1-nano-2025-04-14",
@@ -17,80 +50,764 @@ models = [
     "gpt-4.1-2025-04-14",
 ]
 
-with open("benchmarking/prompts/baseline.md", "r") as f:
-    baseline_prompt = f.read()
+# Prompt files, read on first use
+PROMPT_FILES = {
+    "baseline": "benchmarking/prompts/baseline.md",
+    "fewshot": "benchmarking/prompts/fewshot.md",
+}
+
+# Output is constrained to the CommitteeExtraction schema, so every response
+# validates into one without any repair
+TEXT_FORMAT = {"format": json_schema_format(CommitteeExtraction)}
+
+# Results are appended here as each inference finishes
+results_file = "benchmarking/data/inferences.csv"
+RESULT_COLUMNS = [
+    "prompt_type",
+    "token_budget",
+    "fast_path",
+    "pack",
+    "newsletter_id",
+    "committee_name_inferred",
+    "committee_name_expected",
+    "cache_hit",
+    "model",
+    "input_tokens",
+    "cached_tokens",
+    "output_tokens",
+    "input_cost",
+    "output_cost",
+    "total_cost",
+    "cache_savings",
+    "cached_cost",
+    "extracted_by",
+]
+RESULT_KEY = [
+    "model",
+    "prompt_type",
+    "token_budget",
+    "fast_path",
+    "pack",
+    "newsletter_id",
+]
+
+# Latency, throughput and retries of every API request, written alongside
+metrics_file = "benchmarking/data/call_metrics.csv"
+CALL_COLUMNS = METRIC_COLUMNS + [
+    "prompt_type",
+    "token_budget",
+    "newsletter_id",
+    "total_cost",
+    "stopped_early",
+    "emails",
+]
+
+
+@functools.cache
+def load_prompts():
+    """The (prompt, prompt_type) pairs every newsletter is run with"""
+    prompts = []
+    for prompt_type, path in PROMPT_FILES.items():
+        with open(path, "r") as f:
+            prompts.append((f.read(), prompt_type))
+    return prompts
+
+
+@functools.cache
+def get_client():
+    """The shared async client, created on first use. Retries are handled by
+    the per-model rate limiters instead of the client"""
+    return AsyncOpenAI(max_retries=0)
 
-with open("benchmarking/prompts/fewshot.md", "r") as f:
-    fewshot_prompt = f.read()
 
-client = AsyncOpenAI()
+@functools.cache
+def get_cache():
+    """The on-disk response cache, so re-runs only pay for new requests"""
+    return ResponseCache("benchmarking/data/response_cache.sqlite")
 
 
-# Load training data from CSV and create Newsletter instances
-df = pd.read_csv("fundraising-emails/training.csv", encoding="utf-8")
-df = df.fillna("")  # Replace NaN values with empty strings
-newsletters = [Newsletter(**row) for _, row in df.iterrows()]
+@functools.cache
+def get_newsletters():
+    """Training newsletters, with ids computed once per newsletter"""
+    df = pd.read_csv("fundraising-emails/training.csv", encoding="utf-8")
+    newsletters = load_newsletters(df)
+    print(f"Loaded {len(newsletters)} newsletters from training data")
+    return newsletters
 
-print(f"Loaded {len(newsletters)} newsletters from training data")
 
+def estimate_tokens(prompt, body, output_tokens=200):
+    """Token estimate for a request, used to reserve rate-limit capacity"""
+    return count_tokens(prompt) + count_tokens(body) + output_tokens
 
-async def run_inference(model, newsletter, prompt, prompt_type, semaphore):
-    """Run inference for a single newsletter with a given model and prompt"""
-    async with semaphore:
-        response = await client.responses.create(
-            model=model,
-            instructions=prompt,
-            input=newsletter.body,
-            temperature=0.0,
+
+def prepare_input(body, budget):
+    """The part of a newsletter sent to the model: all of it, or only the
+    disclaimer window when a token budget is set"""
+    return disclaimer_window(body, budget) if budget else body
+
+
+def result_key(model, prompt_type, variant, newsletter):
+    """The RESULT_KEY values identifying one inference"""
+    row = {"model": model, "prompt_type": prompt_type, **variant}
+    row["newsletter_id"] = newsletter.uuid
+    return tuple(row[col] for col in RESULT_KEY)
+
+
+@functools.cache
+def fast_path_answers(threshold):
+    """Committees the rule-based parser extracts with at least `threshold`
+    confidence, keyed by newsletter uuid. These skip the model entirely."""
+    answers = {}
+    if threshold:
+        for newsletter in get_newsletters():
+            committee, confidence = extract_committee(newsletter.body)
+            if confidence >= threshold:
+                answers[newsletter.uuid] = committee
+    return answers
+
+
+def build_rule_result(model, newsletter, prompt_type, variant):
+    """A row of inferences.csv for a newsletter resolved without the model"""
+    return {
+        "prompt_type": prompt_type,
+        **variant,
+        "newsletter_id": newsletter.uuid,
+        "committee_name_inferred": fast_path_answers(variant["fast_path"])[
+            newsletter.uuid
+        ],
+        "committee_name_expected": newsletter.committee,
+        "cache_hit": False,
+        "model": model,
+        "input_tokens": 0,
+        "cached_tokens": 0,
+        "output_tokens": 0,
+        "input_cost": 0.0,
+        "output_cost": 0.0,
+        "total_cost": 0.0,
+        "cache_savings": 0.0,
+        "cached_cost": 0.0,
+        "extracted_by": "rules",
+    }
+
+
+def preflight(variant, batch=False, output_tokens=20):
+    """Count input tokens for every request and estimate the run's cost
+    before any call is made"""
+    # Load the tokenizer first, so a failed download is reported up front
+    counted = "counted" if get_encoding() else "estimated"
+    budget = variant["token_budget"]
+    newsletters = get_newsletters()
+    prompts = [prompt for prompt, _ in load_prompts()]
+    resolved = fast_path_answers(variant["fast_path"])
+    inputs = [
+        prepare_input(newsletter.body, budget)
+        for newsletter in newsletters
+        if newsletter.uuid not in resolved
+    ]
+    input_tokens = sum(count_tokens(body) for body in inputs)
+    full_tokens = sum(count_tokens(newsletter.body) for newsletter in newsletters)
+    if resolved:
+        print(
+            f"Fast path: {len(resolved)} of {len(newsletters)} newsletters "
+            "resolved by the disclaimer parser"
         )
+    print(
+        f"Pre-flight: {input_tokens} newsletter tokens per model and prompt"
+        f" ({input_tokens / full_tokens:.1%} of full bodies, {counted})"
+    )
 
-    cost = calculate_openai_cost(response)
+    total = 0.0
+    for model in models:
+        tokens = sum(
+            count_tokens(prompt) * len(inputs) + input_tokens for prompt in prompts
+        )
+        requests = len(prompts) * len(inputs)
+        cost = estimate_cost(model, tokens, requests * output_tokens, batch)
+        total += cost
+        print(f"  {model}: {requests} requests, {tokens} input tokens, ~${cost:.4f}")
+    print(f"  Estimated total before caching: ~${total:.4f}")
+    return total
 
+
+async def stream_inference(request, estimated_tokens, limiter, timer):
+    """Stream a response and cancel it as soon as the committee field is
+    complete and valid. Returns the output text, its cost and whether it was
+    cut short; a cancelled stream never reports usage, so its cost is
+    estimated from locally counted tokens"""
+    create = get_client().responses.with_raw_response.create
+    stream = await limiter.call(
+        lambda: create(**request, stream=True), estimated_tokens, timer=timer
+    )
+    fields = FieldStream(CommitteeExtraction)
+    response = None
     try:
-        response_parsed = json.loads(response.output_text)
-        committee_name = response_parsed["committee"]
-    except json.JSONDecodeError:
+        async for event in stream:
+            if event.type == "response.output_text.delta":
+                timer.first_byte()
+                if fields.feed(event.delta):
+                    break
+            elif event.type == "response.completed":
+                response = event.response
+    finally:
+        # Closing the connection stops generation on the server
+        await stream.close()
+
+    if response is not None:
+        cost = calculate_openai_cost(response)
+    else:
+        input_tokens = count_tokens(request["instructions"]) + count_tokens(
+            request["input"]
+        )
+        cost = estimate_usage_cost(
+            request["model"], input_tokens, count_tokens(fields.text)
+        )
+    cached = {"output_text": fields.output_text(), "cost": cost}
+    return cached, response is None
+
+
+async def run_inference(
+    model,
+    newsletter,
+    prompt,
+    prompt_type,
+    limiter,
+    variant,
+    metrics=None,
+    stream=False,
+):
+    """Run inference for a single newsletter with a given model and prompt,
+    recording the timing of any API request in `metrics`. With `stream`, the
+    response is streamed and cut off once its answer is complete"""
+    timer = CallTimer(model)
+    body = prepare_input(newsletter.body, variant["token_budget"])
+    cache = get_cache()
+    cache_key = cache.make_key(model, prompt, body, temperature=0.0, text=TEXT_FORMAT)
+    cached = cache.get(cache_key)
+    cache_hit = cached is not None
+    if not cache_hit:
+        request = {
+            "model": model,
+            "instructions": prompt,
+            "input": body,
+            "temperature": 0.0,
+            "text": TEXT_FORMAT,
+            # Route requests sharing a prompt to the same prefix cache
+            "extra_body": {"prompt_cache_key": prompt_type},
+        }
+        if stream:
+            cached, stopped_early = await stream_inference(
+                request, estimate_tokens(prompt, body), limiter, timer
+            )
+        else:
+            response = await limiter.call(
+                lambda: get_client().responses.with_raw_response.create(**request),
+                estimate_tokens(prompt, body),
+                timer=timer,
+            )
+            cached = {
+                "output_text": response.output_text,
+                "cost": calculate_openai_cost(response),
+            }
+            stopped_early = False
+        cache.set(cache_key, cached)
+        cost = cached["cost"]
+        timer.finish(cost["input_tokens"], cost["output_tokens"])
+        if metrics is not None:
+            metrics.write(
+                timer.row(
+                    prompt_type=prompt_type,
+                    token_budget=variant["token_budget"],
+                    newsletter_id=newsletter.uuid,
+                    total_cost=cost["total_cost"],
+                    stopped_early=stopped_early,
+                )
+            )
+
+    return build_result(model, newsletter, prompt_type, variant, cached, cache_hit)
+
+
+async def run_packed_inference(
+    model, group, prompt, prompt_type, limiter, variant, metrics=None
+):
+    """Run inference for a pack of newsletters in a single request, each
+    labelled in the input and answered in one JSON array. A reply that does
+    not answer every newsletter is split in half and retried, down to single
+    newsletters, which go through run_inference. Returns a result per
+    newsletter, each charged an equal share of the request's cost, plus of
+    any unusable reply's cost before it was split"""
+    if len(group) == 1:
+        result = await run_inference(
+            model, group[0], prompt, prompt_type, limiter, variant, metrics
+        )
+        return [result]
+
+    timer = CallTimer(model)
+    instructions = prompt + PACK_INSTRUCTIONS
+    body = format_pack(
+        [
+            prepare_input(newsletter.body, variant["token_budget"])
+            for newsletter in group
+        ]
+    )
+    output_model = packed_model(CommitteeExtraction)
+    text_format = {"format": json_schema_format(output_model)}
+    cache = get_cache()
+    cache_key = cache.make_key(
+        model, instructions, body, temperature=0.0, text=text_format
+    )
+    cached = cache.get(cache_key)
+    cache_hit = cached is not None
+    if not cache_hit:
+        response = await limiter.call(
+            lambda: get_client().responses.with_raw_response.create(
+                model=model,
+                instructions=instructions,
+                input=body,
+                temperature=0.0,
+                text=text_format,
+                extra_body={"prompt_cache_key": f"{prompt_type}-pack"},
+            ),
+            estimate_tokens(instructions, body, output_tokens=30 * len(group)),
+            timer=timer,
+        )
+        cached = {
+            "output_text": response.output_text,
+            "cost": calculate_openai_cost(response),
+        }
+        cost = cached["cost"]
+        timer.finish(cost["input_tokens"], cost["output_tokens"])
+        if metrics is not None:
+            metrics.write(
+                timer.row(
+                    prompt_type=prompt_type,
+                    token_budget=variant["token_budget"],
+                    total_cost=cost["total_cost"],
+                    stopped_early=False,
+                    emails=len(group),
+                )
+            )
+
+    try:
+        answers = parse_pack(output_model, cached["output_text"], len(group))
+    except ValueError as e:
+        print(f"Splitting a pack of {len(group)} for {model}: {e}")
+        halves = await asyncio.gather(
+            *(
+                run_packed_inference(
+                    model, half, prompt, prompt_type, limiter, variant, metrics
+                )
+                for half in split(group)
+            )
+        )
+        results = [result for half in halves for result in half]
+        if not cache_hit:
+            # The unusable reply was still paid for, so its emails share it
+            for result in results:
+                for key, value in cached["cost"].items():
+                    if key != "model":
+                        result[key] += value / len(results)
+        return results
+    # Only replies that could be used are worth reusing
+    if not cache_hit:
+        cache.set(cache_key, cached)
+
+    share = {
+        key: value / len(group) if key != "model" else value
+        for key, value in cached["cost"].items()
+    }
+    return [
+        build_result(
+            model,
+            newsletter,
+            prompt_type,
+            variant,
+            {"output_text": answer.model_dump_json(exclude={"id"}), "cost": share},
+            cache_hit,
+        )
+        for newsletter, answer in zip(group, answers)
+    ]
+
+
+def build_result(model, newsletter, prompt_type, variant, cached, cache_hit):
+    """Turn a model's output text and cost into a row of inferences.csv. A
+    response-cache hit spent nothing this run, so its costs are 0 and what
+    the original request cost goes in cached_cost"""
+    try:
+        # Validated straight from the JSON text, without an intermediate dict
+        extraction = CommitteeExtraction.model_validate_json(cached["output_text"])
+        committee_name = extraction.committee
+    except ValidationError:
         print(
             f"Error decoding JSON for newsletter {newsletter.uuid} with model {model} and prompt {prompt_type}"
         )
         committee_name = "<PARSING ERROR>"
 
+    cost = dict(cached["cost"])
+    cached_cost = 0.0
+    if cache_hit:
+        cached_cost = cost["total_cost"]
+        for key in ("input_cost", "output_cost", "total_cost", "cache_savings"):
+            cost[key] = 0.0
+
     return {
         "prompt_type": prompt_type,
+        **variant,
         "newsletter_id": newsletter.uuid,
         "committee_name_inferred": committee_name,
         "committee_name_expected": newsletter.committee,
+        "cache_hit": cache_hit,
         **cost,
+        "cached_cost": cached_cost,
+        "extracted_by": "model",
     }
 
 
-async def run_all_inferences():
-    """Run all inferences in parallel with rate limiting"""
-    # Limit concurrent requests to avoid rate limits
-    semaphore = asyncio.Semaphore(20)
+def report_prompt_cache(results):
+    """Print the prompt-cache hit ratio and savings for this run's requests"""
+    summary = summarize_prompt_cache(results)
+    if not summary:
+        return
+    print("Prompt cache (API requests made this run):")
+    for row in summary:
+        print(
+            f"  {row['model']} / {row['prompt_type']}: "
+            f"{row['hit_ratio']:.1%} of {row['input_tokens']} input tokens cached, "
+            f"${row['total_cost']:.4f} spent, ${row['cache_savings']:.4f} saved"
+        )
+    total_cost = sum(row["total_cost"] for row in summary)
+    total_savings = sum(row["cache_savings"] for row in summary)
+    print(f"  Total: ${total_cost:.4f} spent, ${total_savings:.4f} saved")
+
+
+def normalize_committee(values):
+    """Lower-case and trim committee names, treating missing ones as empty"""
+    values = values.fillna("").astype(str).str.strip().str.casefold()
+    return values.replace({"none": "", "null": "", "<parsing error>": "<error>"})
+
+
+def report_accuracy(path=results_file):
+    """Print accuracy, input size, cost and the share of newsletters resolved
+    without the model for each model, prompt, token budget, fast-path
+    threshold and pack size in the results file, showing what each saving
+    costs in accuracy. total_cost is what was spent; cached_cost is what
+    responses reused from the cache originally cost"""
+    results = pd.read_csv(path, encoding="utf-8")
+    if results.empty:
+        return
+    # Files written before these options existed ran without them
+    defaults = {
+        "token_budget": 0,
+        "fast_path": 0,
+        "pack": 1,
+        "cached_cost": 0.0,
+        "extracted_by": "model",
+    }
+    for col, default in defaults.items():
+        if col not in results:
+            results[col] = default
+    results["correct"] = normalize_committee(
+        results["committee_name_inferred"]
+    ) == normalize_committee(results["committee_name_expected"])
+    results["rules"] = results["extracted_by"] == "rules"
+    summary = results.groupby(
+        ["model", "prompt_type", "token_budget", "fast_path", "pack"]
+    ).agg(
+        requests=("correct", "size"),
+        accuracy=("correct", "mean"),
+        rule_share=("rules", "mean"),
+        mean_input_tokens=("input_tokens", "mean"),
+        total_cost=("total_cost", "sum"),
+        cached_cost=("cached_cost", "sum"),
+    )
+    print(
+        "Accuracy by model, prompt, token budget (0 = full body), fast-path "
+        "threshold (0 = off) and emails per request:"
+    )
+    print(summary.to_string(float_format=lambda value: f"{value:.4f}"))
+
+
+async def run_all_inferences(
+    log, variant, metrics=None, stream=False, pack_tokens=PACK_TOKENS
+):
+    """Run all inferences in parallel with rate limiting, logging each result
+    and the timing of each API request. With a `pack` above 1 in `variant`,
+    newsletters are sent up to that many per request, as long as their
+    inputs fit in `pack_tokens` tokens"""
+    # Each model has its own limits, learned from the rate-limit headers
+    limiters = {model: RateLimiter() for model in models}
     tasks = []
-    prompts = [(baseline_prompt, "baseline"), (fewshot_prompt, "fewshot")]
+    prompts = load_prompts()
+    resolved = fast_path_answers(variant["fast_path"])
+    results = []
 
+    # Tasks start in creation order (as_completed would shuffle bare
+    # coroutines), so each (model, prompt) group goes out together while its
+    # shared prefix is still in the prompt cache
     for model in models:
         print(f"Preparing inference tasks for model: {model}")
-        for newsletter in newsletters:
-            for prompt, prompt_type in prompts:
+        for prompt, prompt_type in prompts:
+            pending = []
+            for newsletter in get_newsletters():
+                if result_key(model, prompt_type, variant, newsletter) in log:
+                    continue
+                if newsletter.uuid in resolved:
+                    result = build_rule_result(model, newsletter, prompt_type, variant)
+                    log.write(result)
+                    results.append(result)
+                    continue
+                pending.append(newsletter)
+
+            if variant["pack"] > 1:
+                groups = pack(
+                    pending,
+                    variant["pack"],
+                    pack_tokens,
+                    lambda newsletter: prepare_input(
+                        newsletter.body, variant["token_budget"]
+                    ),
+                )
+                tasks.extend(
+                    asyncio.create_task(
+                        run_packed_inference(
+                            model,
+                            group,
+                            prompt,
+                            prompt_type,
+                            limiters[model],
+                            variant,
+                            metrics,
+                        )
+                    )
+                    for group in groups
+                )
+                continue
+            for newsletter in pending:
                 tasks.append(
-                    run_inference(model, newsletter, prompt, prompt_type, semaphore)
+                    asyncio.create_task(
+                        run_inference(
+                            model,
+                            newsletter,
+                            prompt,
+                            prompt_type,
+                            limiters[model],
+                            variant,
+                            metrics,
+                            stream,
+                        )
+                    )
                 )
 
-    print(f"Running {len(tasks)} inference tasks in parallel (max 20 concurrent)...")
-    results = []
+    print(f"Running {len(tasks)} inference tasks in parallel...")
+    failures = 0
     for task in tqdm(asyncio.as_completed(tasks), total=len(tasks)):
-        result = await task
+        try:
+            result = await task
+        except Exception as e:
+            # Left out of the log, so a --resume run retries it
+            failures += 1
+            print(f"Inference failed: {e!r}")
+            continue
+        # Packed tasks return a result per newsletter in the pack
+        for row in result if isinstance(result, list) else [result]:
+            log.write(row)
+            results.append(row)
+    if failures:
+        print(f"{failures} inferences failed; re-run with --resume to retry them")
+
+    print(f"Response cache: {get_cache().stats()}")
+    report_prompt_cache(results)
+    for model, limiter in limiters.items():
+        print(
+            f"{model}: {limiter.retries} retries, "
+            f"limits {limiter.requests.capacity} RPM / {limiter.tokens.capacity} TPM"
+        )
+    return results
+
+
+def run_batch_inferences(log, variant, poll_interval=30):
+    """Run all uncached inferences through the Batch API at half price"""
+    prompts = load_prompts()
+    cache = get_cache()
+    resolved = fast_path_answers(variant["fast_path"])
+    results = []
+    pending = {}
+    requests_by_model = {model: [] for model in models}
+
+    # Grouped by prompt within each model's batch, as in run_all_inferences
+    for model in models:
+        for prompt, prompt_type in prompts:
+            for index, newsletter in enumerate(get_newsletters()):
+                if result_key(model, prompt_type, variant, newsletter) in log:
+                    continue
+                if newsletter.uuid in resolved:
+                    result = build_rule_result(model, newsletter, prompt_type, variant)
+                    log.write(result)
+                    results.append(result)
+                    continue
+                body = prepare_input(newsletter.body, variant["token_budget"])
+                cache_key = cache.make_key(
+                    model, prompt, body, temperature=0.0, text=TEXT_FORMAT
+                )
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    result = build_result(
+                        model, newsletter, prompt_type, variant, cached, True
+                    )
+                    log.write(result)
+                    results.append(result)
+                    continue
+
+                custom_id = f"{model}-{prompt_type}-{index}"
+                pending[custom_id] = (model, newsletter, prompt_type, cache_key)
+                requests_by_model[model].append(
+                    (
+                        custom_id,
+                        {
+                            "model": model,
+                            "instructions": prompt,
+                            "input": body,
+                            "temperature": 0.0,
+                            "text": TEXT_FORMAT,
+                            "prompt_cache_key": prompt_type,
+                        },
+                    )
+                )
+
+    print(f"{len(results)} local results, submitting {len(pending)} batch requests")
+    responses = run_batches(
+        OpenAI(), requests_by_model, "benchmarking/data/batches", poll_interval
+    )
+
+    for custom_id, response in responses.items():
+        if response is None or custom_id not in pending:
+            continue
+        model, newsletter, prompt_type, cache_key = pending[custom_id]
+        cached = {
+            "output_text": response.output_text,
+            "cost": calculate_openai_cost(response, batch=True),
+        }
+        cache.set(cache_key, cached)
+        result = build_result(model, newsletter, prompt_type, variant, cached, False)
+        log.write(result)
         results.append(result)
 
+    print(f"Response cache: {cache.stats()}")
+    report_prompt_cache(results)
     return results
 
 
-# Run all inferences in parallel
-inferences = asyncio.run(run_all_inferences())
+def cli(argv=None):
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark OpenAI models")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Submit requests through the Batch API instead of live calls",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=30,
+        help="Seconds between batch status checks",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses and stop each one as soon as its committee "
+        "field is complete",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep the existing inferences.csv and only run what it is missing",
+    )
+    parser.add_argument(
+        "--max-input-tokens",
+        type=int,
+        default=0,
+        help="Send only a window of this many tokens around each disclaimer "
+        "instead of the whole newsletter (0 sends the whole newsletter)",
+    )
+    parser.add_argument(
+        "--pack",
+        type=int,
+        nargs="+",
+        default=[1],
+        metavar="K",
+        help="Send up to K newsletters per request; several values run once "
+        "each, to compare throughput and accuracy (default 1)",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        default=PACK_TOKENS,
+        help="Most input tokens a packed request may carry, so packs of long "
+        f"newsletters are smaller (default {PACK_TOKENS})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count tokens and estimate the cost of the run",
+    )
+    parser.add_argument(
+        "--fast-path",
+        type=float,
+        nargs="?",
+        const=DEFAULT_THRESHOLD,
+        default=0,
+        help="Resolve newsletters whose disclaimer the rule-based parser reads "
+        "with at least this confidence without calling a model "
+        f"(default {DEFAULT_THRESHOLD})",
+    )
+    args = parser.parse_args(argv)
+    if args.batch and args.pack != [1]:
+        parser.error("--pack only applies to live requests, not --batch")
+
+    variants = [
+        {
+            "token_budget": args.max_input_tokens,
+            "fast_path": args.fast_path,
+            "pack": pack_size,
+        }
+        for pack_size in args.pack
+    ]
+    preflight(variants[0], args.batch)
+    if args.dry_run:
+        return
+
+    with ResultsLog(results_file, RESULT_COLUMNS, RESULT_KEY, args.resume) as log:
+        if log.completed:
+            print(f"Resuming: {len(log.completed)} results already in {results_file}")
+        if args.batch:
+            run_batch_inferences(log, variants[0], args.poll_interval)
+        else:
+            throughput = []
+            with ResultsLog(metrics_file, CALL_COLUMNS, [], args.resume) as metrics:
+                for variant in variants:
+                    start = time.perf_counter()
+                    # Run all inferences in parallel
+                    results = asyncio.run(
+                        run_all_inferences(
+                            log, variant, metrics, args.stream, args.pack_tokens
+                        )
+                    )
+                    throughput.append(
+                        (variant["pack"], len(results), time.perf_counter() - start)
+                    )
+            if len(throughput) > 1:
+                print("Throughput by emails per request:")
+                for pack_size, count, seconds in throughput:
+                    print(
+                        f"  {pack_size}: {count} inferences in {seconds:.1f}s "
+                        f"({count / seconds:.1f}/s)"
+                    )
+            calls = load_calls(metrics_file)
+            if calls:
+                print("Request latency and throughput by model:")
+                print_call_summary(summarize_calls(calls))
+
+    report_accuracy()
+
 
-# Write inferences to CSV using pandas
-results_df = pd.DataFrame(inferences)
-results_df.to_csv("benchmarking/data/inferences.csv", index=False, encoding="utf-8")
+if __name__ == "__main__":
+    cli()
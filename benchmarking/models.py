@@ -1,6 +1,28 @@
+from dataclasses import dataclass
+from functools import cache, cached_property
 from uuid import NAMESPACE_DNS, uuid5
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, create_model
+
+# Fields identifying a newsletter, joined with "-" into the string its id is
+# derived from
+ID_FIELDS = [
+    "committee",
+    "name",
+    "email",
+    "subject",
+    "date",
+    "year",
+    "month",
+    "day",
+    "hour",
+    "minute",
+    "domain",
+]
+
+
+def newsletter_id(unique_str):
+    return str(uuid5(NAMESPACE_DNS, unique_str))
 
 
 class Newsletter(BaseModel):
@@ -19,7 +41,93 @@ class Newsletter(BaseModel):
     party: str
     disclaimer: bool
 
-    @property
+    @cached_property
     def uuid(self) -> str:
         unique_str = f"{self.committee}-{self.name}-{self.email}-{self.subject}-{self.date}-{self.year}-{self.month}-{self.day}-{self.hour}-{self.minute}-{self.domain}"
-        return str(uuid5(NAMESPACE_DNS, unique_str))
+        return newsletter_id(unique_str)
+
+
+@dataclass(slots=True, frozen=True)
+class NewsletterRecord:
+    """
+    A lightweight, read-only newsletter with its id computed up front, for
+    loading whole datasets without one Pydantic model per row.
+    """
+
+    committee: str
+    name: str
+    email: str
+    subject: str
+    date: str
+    year: int
+    month: int
+    day: int
+    hour: int
+    minute: int
+    domain: str
+    body: str
+    party: str
+    disclaimer: bool
+    uuid: str
+
+
+def newsletter_ids(df):
+    """
+    The ids of a DataFrame of newsletters, the same as `Newsletter.uuid`, with
+    each column converted to strings once rather than formatted row by row.
+    """
+    columns = [df[field].astype(str).tolist() for field in ID_FIELDS]
+    return [newsletter_id("-".join(values)) for values in zip(*columns)]
+
+
+def load_newsletters(df):
+    """
+    Turn a DataFrame of newsletters into NewsletterRecords. Columns are cast
+    to the Newsletter field types once each, rather than validated row by
+    row, and missing values become empty strings.
+    """
+    types = {name: field.annotation for name, field in Newsletter.model_fields.items()}
+    df = df[list(types)].fillna("").astype(types)
+    columns = [df[name].tolist() for name in types]
+    columns.append(newsletter_ids(df))
+    return [NewsletterRecord(*values) for values in zip(*columns)]
+
+
+class CommitteeExtraction(BaseModel):
+    """The structured output the benchmark asks models for"""
+
+    # Strict structured output needs additionalProperties: false
+    model_config = ConfigDict(extra="forbid")
+
+    committee: str | None
+
+
+class EmailExtraction(CommitteeExtraction):
+    """The structured output email_ollama asks models for"""
+
+    sender: str | None
+
+
+def json_schema_format(output_model):
+    """The Responses API `text.format` constraining output to `output_model`"""
+    return {
+        "type": "json_schema",
+        "name": output_model.__name__,
+        "schema": output_model.model_json_schema(),
+        "strict": True,
+    }
+
+
+@cache
+def packed_model(output_model):
+    """The structured output for several emails answered in one request: a
+    `results` list of `output_model` objects, each with the email's label as
+    `id`"""
+    item = create_model(
+        f"{output_model.__name__}Item", __base__=output_model, id=(int, ...)
+    )
+    return create_model(
+        f"{output_model.__name__}Pack",
+        __config__=ConfigDict(extra="forbid"),
+        results=(list[item], ...),
+    )
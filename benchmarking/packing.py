@@ -0,0 +1,73 @@
+from pydantic import ValidationError
+
+try:
+    from .token_budget import count_tokens
+except ImportError:  # run as a script from this directory, not as a package
+    from token_budget import count_tokens
+
+# Appended to the prompt when several emails share one request
+PACK_INSTRUCTIONS = """
+
+You will be given several emails at once. Each one starts with a line "### Email <id>". Extract the fields above for every email and return a JSON object with the key 'results': an array with one object per email, in the order given, holding the email's 'id' and its fields."""
+
+# Default input budget for a packed request, well inside every model's
+# context window once the prompt and the answers are added
+PACK_TOKENS = 8000
+
+
+def pack(items, max_items, max_tokens=PACK_TOKENS, text=lambda item: item):
+    """
+    Group `items` in order into packs of at most `max_items` whose texts
+    (`text(item)`) add up to at most `max_tokens` tokens, so short emails
+    share a request and long ones get fewer companions. An item over the
+    budget on its own gets a pack of its own. Packs are yielded as they fill,
+    so `items` can be a stream.
+    """
+    current = []
+    tokens = 0
+    for item in items:
+        size = count_tokens(text(item))
+        if current and (len(current) >= max_items or tokens + size > max_tokens):
+            yield current
+            current = []
+            tokens = 0
+        current.append(item)
+        tokens += size
+    if current:
+        yield current
+
+
+def format_pack(texts):
+    """
+    Join the texts of a pack into one input, labelling each with its
+    position (1, 2, ...), which is shorter and harder to garble than an id.
+    """
+    return "\n\n".join(
+        f"### Email {label}\n{text}" for label, text in enumerate(texts, start=1)
+    )
+
+
+def parse_pack(output_model, text, size):
+    """
+    Parse a packed reply into one result per email, in pack order. Raises
+    ValueError if it does not validate against `output_model` (a
+    models.packed_model) or does not answer every email exactly once.
+    """
+    try:
+        results = output_model.model_validate_json(text).results
+    except ValidationError as e:
+        raise ValueError(f"malformed packed reply: {e}") from e
+    by_label = {result.id: result for result in results}
+    if len(results) != size or sorted(by_label) != list(range(1, size + 1)):
+        raise ValueError(
+            f"packed reply answers emails {sorted(by_label)}, expected 1-{size}"
+        )
+    return [by_label[label] for label in range(1, size + 1)]
+
+
+def split(items):
+    """
+    Halve a pack whose reply could not be used, for a retry at a smaller size.
+    """
+    middle = len(items) // 2
+    return items[:middle], items[middle:]
@@ -0,0 +1,191 @@
+import asyncio
+import random
+import re
+import time
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+# Errors worth retrying: rate limits, server errors and dropped connections
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    InternalServerError,
+    APIConnectionError,
+    APITimeoutError,
+)
+
+
+def parse_reset(value):
+    """
+    Parse a rate-limit reset duration such as '1s', '6m0s' or '20ms' into
+    seconds. Returns None if the value cannot be parsed.
+    """
+    if not value:
+        return None
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """
+    A bucket holding up to `capacity` units that refills at `capacity` per
+    minute. Levels may go negative when usage turns out higher than estimated.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        rate = self.capacity / 60
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """
+        Seconds until `amount` units are available.
+        """
+        self.refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / (self.capacity / 60)
+
+    def take(self, amount):
+        self.refill()
+        self.level -= amount
+
+    def sync(self, limit, remaining):
+        """
+        Adopt the limit and remaining count reported by the API.
+        """
+        self.refill()
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Per-model scheduler that keeps requests/min and tokens/min under the
+    account limits.
+
+    Starts from conservative limits and adopts the real ones from the
+    `x-ratelimit-*` headers on each response. After a 429 every request for
+    the model waits until the reported reset time.
+    """
+
+    def __init__(
+        self, requests_per_minute=500, tokens_per_minute=200_000, max_concurrency=100
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        self.lock = asyncio.Lock()
+        self.paused_until = 0.0
+        self.retries = 0
+
+    async def acquire(self, estimated_tokens):
+        """
+        Wait until one request and `estimated_tokens` tokens are available,
+        then take them.
+        """
+        async with self.lock:
+            while True:
+                wait = max(
+                    self.paused_until - time.monotonic(),
+                    self.requests.wait_time(1),
+                    self.tokens.wait_time(estimated_tokens),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Correct the token bucket once the real usage of a request is known.
+        """
+        self.tokens.take(actual_tokens - estimated_tokens)
+
+    def update_from_headers(self, headers):
+        def number(name):
+            value = headers.get(name)
+            try:
+                return int(value) if value is not None else None
+            except ValueError:
+                return None
+
+        self.requests.sync(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+        )
+        self.tokens.sync(
+            number("x-ratelimit-limit-tokens"),
+            number("x-ratelimit-remaining-tokens"),
+        )
+
+    def pause(self, headers, fallback):
+        """
+        Hold back every request for this model after a 429, for as long as
+        the API asked (or `fallback` seconds).
+        """
+        delay = parse_reset(headers.get("retry-after-ms"))
+        if delay is not None:
+            delay /= 1000
+        else:
+            delay = parse_reset(headers.get("retry-after"))
+        if delay is None:
+            delay = fallback
+        self.paused_until = max(self.paused_until, time.monotonic() + delay)
+
+    async def call(
+        self, request, estimated_tokens, max_retries=6, backoff=1.0, timer=None
+    ):
+        """
+        Run `request`, a coroutine function returning a raw API response, under
+        the rate limits. Rate-limit and server errors are retried with jittered
+        exponential backoff. Returns the parsed response.
+
+        If a CallTimer is given, each attempt is marked on it as it is sent.
+        """
+        for attempt in range(max_retries + 1):
+            await self.acquire(estimated_tokens)
+            try:
+                async with self.concurrency:
+                    if timer is not None:
+                        timer.attempt()
+                    raw = await request()
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                self.retries += 1
+                delay = random.uniform(0, backoff * 2**attempt)
+                response = getattr(e, "response", None)
+                if isinstance(e, RateLimitError) and response is not None:
+                    self.update_from_headers(response.headers)
+                    self.pause(response.headers, delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+
+            self.update_from_headers(raw.headers)
+            response = raw.parse()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                self.record_usage(estimated_tokens, usage.total_tokens)
+            return response
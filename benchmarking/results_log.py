@@ -0,0 +1,102 @@
+import csv
+import os
+
+
+def drop_partial_line(path):
+    """
+    Truncate a file after its last newline, removing a row left half-written
+    by a crash so that appended rows start on a line of their own.
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+def canonical(value):
+    """
+    The string a key value is compared by, the same whether it comes from a
+    run's arguments or is read back from the CSV: numbers compare by value,
+    so 0, 0.0 and "0.0" all give "0".
+    """
+    text = str(value)
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return str(int(number)) if number.is_integer() else repr(number)
+
+
+class ResultsLog:
+    """
+    Append-only CSV of results, flushed after every row so a failure part-way
+    through a run keeps everything finished before it.
+
+    With `resume=True` an existing file is kept and `completed` holds the
+    `key_columns` values of the rows already in it; otherwise the file is
+    started afresh.
+    """
+
+    def __init__(self, path, columns, key_columns, resume=False):
+        self.path = path
+        self.key_columns = key_columns
+        self.completed = set()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            drop_partial_line(path)
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                reader = csv.DictReader(f)
+                # Keep the file's own column order so appended rows line up
+                columns = reader.fieldnames or columns
+                for row in reader:
+                    self.completed.add(self.key(row))
+            new_file = os.path.getsize(path) == 0
+        else:
+            new_file = True
+
+        self.file = open(path, "w" if new_file else "a", encoding="utf-8", newline="")
+        self.writer = csv.DictWriter(
+            self.file, fieldnames=columns, restval="", extrasaction="ignore"
+        )
+        if new_file:
+            self.writer.writeheader()
+            self.file.flush()
+
+    def key(self, row):
+        # Files written before a key column existed leave it blank
+        return tuple(canonical(row.get(col, "")) for col in self.key_columns)
+
+    def __contains__(self, key):
+        return tuple(canonical(value) for value in key) in self.completed
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+        self.completed.add(self.key(row))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
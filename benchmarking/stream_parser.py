@@ -0,0 +1,141 @@
+import json
+
+from pydantic import ValidationError
+
+# Reasoning models may think out loud before answering; braces in there are
+# not part of the answer
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+
+class FieldStream:
+    """
+    Incremental parser for a JSON object arriving in chunks.
+
+    Top-level fields are decoded as soon as their value is complete, so the
+    caller can stop generation once every field of `output_model` has been
+    read and the fields validate, instead of waiting for the closing brace and
+    whatever a verbose model emits after it.
+    """
+
+    def __init__(self, output_model):
+        self.output_model = output_model
+        self.required = list(output_model.model_fields)
+        self.text = ""
+        self.values = {}
+        self.done = False
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        # At the top level: expecting a "key", a ":", a "value" or a ","
+        self.expect = None
+        self.key = None
+        self.start = None
+
+    def feed(self, chunk):
+        """
+        Add a chunk of output. Returns True once every required field has
+        been read and they validate against the output model.
+        """
+        if self.done:
+            return True
+        self.text += chunk
+        if self.text.lstrip().startswith(THINK_START):
+            end = self.text.find(THINK_END)
+            if end == -1:
+                return False
+            self.position = max(self.position, end + len(THINK_END))
+
+        if self.expect != "end":
+            for index in range(self.position, len(self.text)):
+                self.step(index, self.text[index])
+                if self.expect == "end":
+                    break
+        self.position = len(self.text)
+
+        if all(key in self.values for key in self.required):
+            try:
+                self.output_model.model_validate(self.fields())
+            except ValidationError:
+                return False
+            self.done = True
+        return self.done
+
+    def fields(self):
+        # Only the output model's fields; anything else the model adds is
+        # ignored
+        return {key: self.values[key] for key in self.required}
+
+    def step(self, index, char):
+        if self.in_string:
+            if self.escape:
+                self.escape = False
+            elif char == "\\":
+                self.escape = True
+            elif char == '"':
+                self.in_string = False
+                if self.depth == 1 and self.start is not None:
+                    token = json.loads(self.text[self.start : index + 1])
+                    self.start = None
+                    if self.expect == "key":
+                        self.key = token
+                        self.expect = ":"
+                    else:
+                        self.values[self.key] = token
+                        self.expect = ","
+            return
+
+        if char == '"':
+            self.in_string = True
+            if self.depth == 1 and self.expect in ("key", "value"):
+                self.start = index
+        elif char in "{[":
+            if self.depth == 0:
+                if char == "{" and self.expect is None:
+                    self.depth = 1
+                    self.expect = "key"
+                return
+            if self.depth == 1 and self.expect == "value":
+                self.start = index
+            self.depth += 1
+        elif char in "}]":
+            if self.depth == 1:
+                # The end of the object completes a trailing scalar value
+                self.end_scalar(index)
+                self.depth = 0
+                self.expect = "end"
+                return
+            self.depth -= 1
+            if self.depth == 1 and self.start is not None:
+                self.values[self.key] = json.loads(self.text[self.start : index + 1])
+                self.start = None
+                self.expect = ","
+        elif self.depth == 1:
+            if char == ":" and self.expect == ":":
+                self.expect = "value"
+            elif char == ",":
+                self.end_scalar(index)
+                self.expect = "key"
+            elif self.expect == "value" and self.start is None:
+                # A number, true, false or null, which ends at "," or "}"
+                if not char.isspace():
+                    self.start = index
+
+    def end_scalar(self, index):
+        if self.expect == "value" and self.start is not None:
+            try:
+                self.values[self.key] = json.loads(self.text[self.start : index])
+            except ValueError:
+                pass
+            self.start = None
+            self.expect = ","
+
+    def output_text(self):
+        """
+        The fields read so far as a JSON document if parsing stopped early,
+        else the text as received.
+        """
+        if self.done:
+            return json.dumps(self.fields(), ensure_ascii=False)
+        return self.text
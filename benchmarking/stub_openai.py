@@ -0,0 +1,285 @@
+import argparse
+import itertools
+import json
+import re
+import time
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the parts of the OpenAI API the harness uses
+# (Responses, Files and Batches), for exercising it without spending tokens:
+#
+#   python benchmarking/stub_openai.py --port 8765
+#   OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=test \
+#       python benchmarking/evaluation.py --batch --poll-interval 1
+
+DISCLAIMER = re.compile(r"paid for by\s+(.+?)(?:[.,\n]|$)", re.IGNORECASE)
+# Labels packing.format_pack puts before each email of a packed request
+PACK_LABEL = re.compile(r"^### Email (\d+)$", re.MULTILINE)
+
+ids = itertools.count(1)
+files = {}
+batches = {}
+# (model, instructions) prefixes already seen, to fake prompt caching
+prefixes = set()
+
+
+def committee(text):
+    match = DISCLAIMER.search(text)
+    return match.group(1).strip() if match else None
+
+
+def fake_answer(text):
+    """
+    The fields for one email, or a result per email for a packed input.
+    """
+    parts = PACK_LABEL.split(text)
+    if len(parts) == 1:
+        return {"committee": committee(text)}
+    labels = parts[1::2]
+    texts = parts[2::2]
+    return {
+        "results": [
+            {"committee": committee(part), "id": int(label)}
+            for label, part in zip(labels, texts)
+        ]
+    }
+
+
+def fake_response(body):
+    """
+    Build a Responses API object that extracts the committee with a regex.
+    """
+    text = body.get("input", "")
+    if not isinstance(text, str):
+        text = json.dumps(text)
+    output_text = json.dumps(fake_answer(text))
+    instructions = body.get("instructions") or ""
+    input_tokens = (len(instructions) + len(text)) // 4
+    output_tokens = len(output_text) // 4
+    # Like the real cache: prefixes of 1024+ tokens, cached in 128-token steps
+    prefix_tokens = len(instructions) // 4
+    cached_tokens = 0
+    if (body.get("model"), instructions) in prefixes and prefix_tokens >= 1024:
+        cached_tokens = prefix_tokens // 128 * 128
+    prefixes.add((body.get("model"), instructions))
+    return {
+        "id": f"resp_{next(ids)}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "status": "completed",
+        "model": body.get("model"),
+        "output": [
+            {
+                "type": "message",
+                "id": f"msg_{next(ids)}",
+                "role": "assistant",
+                "status": "completed",
+                "content": [
+                    {"type": "output_text", "text": output_text, "annotations": []}
+                ],
+            }
+        ],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": cached_tokens},
+            "output_tokens": output_tokens,
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + output_tokens,
+        },
+    }
+
+
+def run_batch(batch):
+    """
+    Process every request in a batch's input file and store the output file.
+    """
+    lines = []
+    for line in files[batch["input_file_id"]]["content"].decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        lines.append(
+            json.dumps(
+                {
+                    "id": f"batch_req_{next(ids)}",
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": 200,
+                        "request_id": f"req_{next(ids)}",
+                        "body": fake_response(request["body"]),
+                    },
+                    "error": None,
+                }
+            )
+        )
+    output = store_file("\n".join(lines).encode("utf-8") + b"\n", "batch_output")
+    batch["status"] = "completed"
+    batch["output_file_id"] = output["id"]
+    batch["completed_at"] = int(time.time())
+    batch["request_counts"] = {
+        "total": len(lines),
+        "completed": len(lines),
+        "failed": 0,
+    }
+
+
+def store_file(content, purpose, filename="upload.jsonl"):
+    file_id = f"file-{next(ids)}"
+    files[file_id] = {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(content),
+        "created_at": int(time.time()),
+        "filename": filename,
+        "purpose": purpose,
+        "status": "processed",
+        "content": content,
+    }
+    return files[file_id]
+
+
+def public(file):
+    return {key: value for key, value in file.items() if key != "content"}
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("x-ratelimit-limit-requests", "10000")
+        self.send_header("x-ratelimit-remaining-requests", "9999")
+        self.send_header("x-ratelimit-limit-tokens", "10000000")
+        self.send_header("x-ratelimit-remaining-tokens", "9999000")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_events(self, response):
+        """
+        Stream a response as server-sent events: its text in small deltas,
+        then the completed response with its usage.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("x-ratelimit-limit-requests", "10000")
+        self.send_header("x-ratelimit-remaining-requests", "9999")
+        self.end_headers()
+        text = response["output"][0]["content"][0]["text"]
+        message_id = response["output"][0]["id"]
+        events = [
+            {
+                "type": "response.created",
+                "response": response | {"status": "in_progress", "output": []},
+            }
+        ]
+        # Trailing whitespace, as verbose models pad their answers
+        text += " " * 32
+        for start in range(0, len(text), 4):
+            events.append(
+                {
+                    "type": "response.output_text.delta",
+                    "item_id": message_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": text[start : start + 4],
+                }
+            )
+        events.append({"type": "response.completed", "response": response})
+        try:
+            for number, event in enumerate(events):
+                event["sequence_number"] = number
+                self.wfile.write(
+                    f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+                )
+                self.wfile.flush()
+                time.sleep(0.005)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream once it had its answer
+            pass
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        body = self.read_body()
+        if self.path == "/v1/responses":
+            request = json.loads(body)
+            if request.get("stream"):
+                self.send_events(fake_response(request))
+            else:
+                self.send_json(fake_response(request))
+        elif self.path == "/v1/files":
+            message = BytesParser(policy=default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            fields = {
+                part.get_param("name", header="content-disposition"): part
+                for part in message.iter_parts()
+            }
+            upload = fields["file"]
+            stored = store_file(
+                upload.get_payload(decode=True),
+                fields["purpose"].get_content().strip(),
+                upload.get_filename() or "upload.jsonl",
+            )
+            self.send_json(public(stored))
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = f"batch_{next(ids)}"
+            batches[batch_id] = {
+                "id": batch_id,
+                "object": "batch",
+                "endpoint": request["endpoint"],
+                "input_file_id": request["input_file_id"],
+                "completion_window": request["completion_window"],
+                "status": "in_progress",
+                "created_at": int(time.time()),
+                "output_file_id": None,
+                "error_file_id": None,
+            }
+            self.send_json(batches[batch_id])
+        else:
+            self.send_json({"error": {"message": "Not found"}}, 404)
+
+    def do_GET(self):
+        match = re.fullmatch(r"/v1/batches/([\w-]+)", self.path)
+        if match and match.group(1) in batches:
+            batch = batches[match.group(1)]
+            # Batches finish on the first poll, so callers see a state change
+            if batch["status"] == "in_progress":
+                payload = dict(batch)
+                run_batch(batch)
+                self.send_json(payload)
+            else:
+                self.send_json(batch)
+            return
+
+        match = re.fullmatch(r"/v1/files/([\w-]+)/content", self.path)
+        if match and match.group(1) in files:
+            content = files[match.group(1)]["content"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+            return
+
+        self.send_json({"error": {"message": "Not found"}}, 404)
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local OpenAI stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Serving OpenAI stand-in on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
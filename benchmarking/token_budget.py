@@ -0,0 +1,81 @@
+import functools
+import re
+
+import tiktoken
+
+# Tokenizer used by the GPT-4.1 family; close enough to budget other models
+ENCODING = "o200k_base"
+
+# Rough size of a token in English text, used when the encoding can't be loaded
+CHARS_PER_TOKEN = 4
+
+# Tokens kept ahead of the disclaimer, so a committee name split over the
+# "Paid for by" line is not cut off
+LEAD_TOKENS = 32
+
+DISCLAIMER = re.compile(r"paid\s+for\s+by", re.IGNORECASE)
+
+
+@functools.cache
+def get_encoding():
+    """
+    Return the tiktoken encoding, or None if its encoding file, downloaded on
+    first use and cached under TIKTOKEN_CACHE_DIR, cannot be fetched.
+    """
+    try:
+        return tiktoken.get_encoding(ENCODING)
+    except Exception as e:
+        print(
+            f"Could not load the {ENCODING} tokenizer ({type(e).__name__}); "
+            f"token counts are estimated at {CHARS_PER_TOKEN} characters per "
+            "token. Run once with network access, or set TIKTOKEN_CACHE_DIR to "
+            "a directory holding the encoding file, for exact counts."
+        )
+        return None
+
+
+@functools.lru_cache(maxsize=8192)
+def count_tokens(text):
+    """
+    Count the tokens in `text`, exactly with tiktoken or estimated from its
+    length if the encoding could not be loaded.
+    """
+    encoding = get_encoding()
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def disclaimer_window(body, budget, lead=LEAD_TOKENS):
+    """
+    Cut `body` down to at most `budget` tokens around its disclaimer.
+
+    Bodies within budget are returned unchanged. Otherwise the window starts
+    `lead` tokens before the last "Paid for by" and runs for `budget` tokens,
+    moved back to end at the end of the body when it would run past it. Bodies
+    with no "Paid for by" keep their last `budget` tokens, where disclaimers
+    almost always are.
+    """
+    if count_tokens(body) <= budget:
+        return body
+    match = None
+    for match in DISCLAIMER.finditer(body):
+        pass
+
+    encoding = get_encoding()
+    if encoding is None:
+        units, lead_units = budget * CHARS_PER_TOKEN, lead * CHARS_PER_TOKEN
+        total = len(body)
+        start = match.start() - lead_units if match else total - units
+        start = max(0, min(start, total - units))
+        return body[start : start + units]
+
+    tokens = encoding.encode(body, disallowed_special=())
+    total = len(tokens)
+    if match:
+        prefix = encoding.encode(body[: match.start()], disallowed_special=())
+        start = len(prefix) - lead
+    else:
+        start = total - budget
+    start = max(0, min(start, total - budget))
+    return encoding.decode(tokens[start : start + budget])
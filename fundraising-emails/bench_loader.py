@@ -0,0 +1,52 @@
+import glob
+import json
+import time
+import tracemalloc
+
+import results_io
+from make_matrix import PREDICTION_FIELDS
+
+
+def measure(load, files):
+    """
+    Load every file, keeping all results alive as the scoring scripts do.
+    Returns wall-clock seconds and peak traced memory in MB.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    loaded = [load(path) for path in files]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return elapsed, peak / 1e6
+
+
+def json_load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def main():
+    files = sorted(glob.glob("*.json"))
+    print(f"Loading {len(files)} model output files")
+    print(f"orjson backend: {'yes' if results_io.orjson else 'no'}\n")
+
+    cases = [
+        ("json.load (full records)", json_load),
+        (
+            "load_records (projected)",
+            lambda path: results_io.load_records(path, PREDICTION_FIELDS),
+        ),
+        (
+            "iter_records (streamed)",
+            lambda path: list(results_io.iter_records(path, PREDICTION_FIELDS)),
+        ),
+    ]
+    for label, load in cases:
+        elapsed, peak = measure(load, files)
+        print(f"{label:<28} {elapsed:>7.3f}s  peak {peak:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
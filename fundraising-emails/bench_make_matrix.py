@@ -0,0 +1,125 @@
+import time
+
+import pandas as pd
+from make_matrix import create_combined_dataframe, load_json_files, load_training_csv
+
+
+def reference_combined_dataframe(training_df, json_data):
+    """
+    The original row-by-row implementation of create_combined_dataframe,
+    kept to check the vectorized version against and to time it.
+    """
+    keep_columns = [
+        "name",
+        "email",
+        "subject",
+        "date",
+        "year",
+        "month",
+        "day",
+        "hour",
+        "minute",
+        "domain",
+        "party",
+        "disclaimer",
+    ]
+    df = training_df[keep_columns].copy()
+    df["committee"] = training_df["committee"].apply(
+        lambda x: str(x).upper() if pd.notna(x) else None
+    )
+
+    for model_name, emails in json_data.items():
+        committee_mapping = {}
+        for email in emails:
+            keys_to_try = [
+                (
+                    email.get("subject", ""),
+                    email.get("date", ""),
+                    email.get("name", ""),
+                ),
+                (
+                    email.get("subject", ""),
+                    email.get("date", ""),
+                    email.get("email", ""),
+                ),
+                (
+                    email.get("subject", ""),
+                    str(email.get("year", "")),
+                    str(email.get("month", "")),
+                    str(email.get("day", "")),
+                ),
+            ]
+            committee_value = email.get("committee", None)
+            if committee_value is not None:
+                committee_value = str(committee_value).upper()
+            for key in keys_to_try:
+                if key not in committee_mapping:
+                    committee_mapping[key] = committee_value
+
+        df[model_name] = None
+        for idx, row in df.iterrows():
+            keys_to_try = [
+                (row.get("subject", ""), row.get("date", ""), row.get("name", "")),
+                (row.get("subject", ""), row.get("date", ""), row.get("email", "")),
+                (
+                    row.get("subject", ""),
+                    str(row.get("year", "")),
+                    str(row.get("month", "")),
+                    str(row.get("day", "")),
+                ),
+            ]
+            for key in keys_to_try:
+                if key in committee_mapping:
+                    df.at[idx, model_name] = committee_mapping[key]
+                    break
+
+    model_columns = [
+        col for col in df.columns if col not in keep_columns + ["committee"]
+    ]
+    df["model_count"] = df[model_columns].notna().sum(axis=1)
+
+    def count_matches(row):
+        canonical = row["committee"]
+        if pd.isna(canonical):
+            return 0
+        return sum(1 for col in model_columns if row[col] == canonical)
+
+    df["exact_matches"] = df.apply(count_matches, axis=1)
+    return df
+
+
+def time_call(func, *args, repeat=3):
+    """
+    Return the result of the last call and the best wall-clock time in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    training_df = load_training_csv()
+    json_data = load_json_files()
+    print(f"\nBenchmarking {len(training_df)} rows x {len(json_data)} models")
+
+    expected, reference_time = time_call(
+        reference_combined_dataframe, training_df, json_data, repeat=1
+    )
+    actual, vectorized_time = time_call(
+        create_combined_dataframe, training_df, json_data
+    )
+
+    pd.testing.assert_frame_equal(
+        actual.astype(object), expected.astype(object), check_dtype=False
+    )
+    print("Outputs match")
+    print(f"Reference:  {reference_time:.3f}s")
+    print(f"Vectorized: {vectorized_time:.3f}s")
+    print(f"Speedup:    {reference_time / vectorized_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
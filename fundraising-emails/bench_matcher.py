@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import pandas as pd
+from matcher import (
+    GroundTruth,
+    csv_file,
+    json_directory,
+    merge_columns,
+    score_predictions,
+)
+
+
+def reference_align(df_csv, df_json):
+    """
+    The original per-file alignment, which re-normalizes the ground truth for
+    every model output file.
+    """
+    df_json = df_json.copy()
+    for col in merge_columns:
+        if col in df_csv.columns and col in df_json.columns:
+            df_csv[col] = df_csv[col].astype(str).str.strip().str.lower()
+            df_json[col] = df_json[col].astype(str).str.strip().str.lower()
+
+    merged = pd.merge(
+        df_csv, df_json, on=merge_columns, how="inner", suffixes=("_csv", "_json")
+    )
+    y_true = merged["committee_csv"].fillna("none").astype(str).str.lower()
+    y_pred = merged["committee_json"].fillna("none").astype(str).str.lower()
+    return y_true, y_pred
+
+
+def main():
+    df_csv = pd.read_csv(csv_file)
+
+    # Load every file up front so the timings cover scoring only
+    predictions = {}
+    for json_filename in sorted(os.listdir(json_directory)):
+        if json_filename.endswith(".json"):
+            with open(os.path.join(json_directory, json_filename), "r") as f:
+                predictions[json_filename] = pd.DataFrame(json.load(f))
+
+    start = time.perf_counter()
+    truth = GroundTruth(df_csv)
+    prepare_time = time.perf_counter() - start
+    print(f"Prepared ground truth ({len(df_csv)} rows) in {prepare_time:.4f}s\n")
+
+    print(f"{'File':<70} {'Rows':>6} {'Align':>9} {'Ref':>9} {'Score':>9}")
+    totals = {"align": 0.0, "reference": 0.0, "score": 0.0}
+    for json_filename, df_json in predictions.items():
+        start = time.perf_counter()
+        y_true, y_pred = truth.align(df_json)
+        align_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ref_true, ref_pred = reference_align(df_csv.copy(), df_json)
+        reference_time = time.perf_counter() - start
+
+        assert sorted(zip(y_true, y_pred)) == sorted(zip(ref_true, ref_pred))
+
+        start = time.perf_counter()
+        score_predictions(json_filename, df_json, truth)
+        score_time = time.perf_counter() - start
+
+        totals["align"] += align_time
+        totals["reference"] += reference_time
+        totals["score"] += score_time
+        print(
+            f"{json_filename:<70} {len(df_json):>6} {align_time * 1000:>7.1f}ms "
+            f"{reference_time * 1000:>7.1f}ms {score_time * 1000:>7.1f}ms"
+        )
+
+    print(
+        f"\nTotal over {len(predictions)} files: align {totals['align']:.3f}s, "
+        f"reference align {totals['reference']:.3f}s, "
+        f"full scoring {totals['score']:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import runpy
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import results_io
+from generate_leaderboard import generate_leaderboard_html
+from make_matrix import create_combined_dataframe, load_json_files, load_training_csv
+from matcher import GroundTruth, score_file
+
+charts_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "charts.py")
+
+# Differences smaller than these are noise, whatever the ratio
+MIN_SECONDS = 0.05
+MIN_MB = 1.0
+
+FIRST_NAMES = ["Maggie", "Rob", "Gay", "Ruben", "Elissa", "Colin", "Marsha", "Tim"]
+LAST_NAMES = ["Hunt", "Ortt", "Valimont", "Gallego", "Slotkin", "Allred", "Walz"]
+OFFICES = ["Congress", "Senate", "Governor", "State Senate", "President"]
+GROUPS = ["Victory Fund", "Action", "PAC", "Democratic Party", "Republican Party"]
+STATES = ["Pennsylvania", "Arizona", "Michigan", "Texas", "Ohio", "Montana"]
+
+FILLER = (
+    "We are facing the most important election of our lifetimes and the other "
+    "side just outraised us again. Before midnight we need 1,500 grassroots "
+    "supporters to chip in so we can stay on the air in the final stretch. "
+    "Will you rush a donation of $5 or more right now to help close the gap? "
+    "Every dollar goes straight to reaching voters, knocking doors and "
+    "fighting back against the lies. Please, friend, we cannot do this alone. "
+)
+
+
+def parse_scale(text):
+    """
+    Parse a scale given as EMAILSxMODELS, e.g. '10000x50'.
+    """
+    emails, models = text.lower().split("x")
+    return int(emails), int(models)
+
+
+def committee_names(count, rng):
+    names = set()
+    while len(names) < count:
+        kind = rng.random()
+        if kind < 0.5:
+            names.add(
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} for "
+                f"{rng.choice(OFFICES)} {len(names)}"
+            )
+        else:
+            names.add(f"{rng.choice(STATES)} {rng.choice(GROUPS)} {len(names)}")
+    return sorted(names)
+
+
+def generate_dataset(directory, emails, models, seed=0):
+    """
+    Write a synthetic training.csv of `emails` rows and one _prompt2.json
+    output file per model, shaped like the real ones: the JSON stores the
+    date fields as text, each model misses about 1% of the emails, and
+    models range from 50% to 95% accurate, their mistakes being wrong,
+    truncated or missing committees.
+    """
+    rng = random.Random(seed)
+    committees = committee_names(max(10, emails // 4), rng)
+    parties = ["D", "R", "I", ""]
+
+    rows = []
+    for i in range(emails):
+        committee = rng.choice(committees)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        domain = f"mail{i % 997}.example.org"
+        day, hour, minute = 1 + i % 30, i % 24, i % 60
+        start = rng.randrange(len(FILLER))
+        filler = (FILLER * (2 + rng.randrange(8)))[start:]
+        rows.append(
+            {
+                "committee": committee,
+                "name": f"{first} {last}",
+                "email": f"{first.lower()}@{domain}",
+                "subject": f"Message {i}: {rng.choice(FILLER.split('. '))}",
+                "date": f"11/{day}/24 {hour}:{minute:02d}",
+                "year": 2024,
+                "month": 11,
+                "day": day,
+                "hour": hour,
+                "minute": minute,
+                "domain": domain,
+                "body": f"{filler}\nPaid for by {committee}. Not authorized by "
+                "any candidate.",
+                "party": rng.choice(parties),
+                "disclaimer": True,
+            }
+        )
+    training = pd.DataFrame(rows)
+    training["party"] = training["party"].replace("", None)
+    training.to_csv(os.path.join(directory, "training.csv"), index=False)
+
+    as_text = ["year", "month", "day", "hour", "minute", "disclaimer"]
+    records = [
+        {**row, **{field: str(row[field]) for field in as_text}}
+        for row in training.fillna("").to_dict("records")
+    ]
+    truth = training["committee"].to_numpy(dtype=object)
+    nprng = np.random.default_rng(seed)
+    for m in range(models):
+        accuracy = 0.5 + 0.45 * m / max(models - 1, 1)
+        kept = np.flatnonzero(nprng.random(emails) >= 0.01)
+        outcome = nprng.random(len(kept))
+        wrong = nprng.integers(len(committees), size=len(kept))
+        predictions = []
+        for position, index in enumerate(kept):
+            roll = outcome[position]
+            if roll < accuracy:
+                committee = truth[index]
+            elif roll < accuracy + (1 - accuracy) / 3:
+                committee = truth[index].rsplit(" ", 1)[0]
+            elif roll < accuracy + 2 * (1 - accuracy) / 3:
+                committee = committees[wrong[position]]
+            else:
+                committee = None
+            predictions.append({**records[index], "committee": committee})
+        write_json(
+            os.path.join(directory, f"synth{m:03d}_model_november_2024_prompt2.json"),
+            predictions,
+        )
+
+
+def write_json(path, records):
+    if results_io.orjson is not None:
+        with open(path, "wb") as f:
+            f.write(results_io.orjson.dumps(records))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(records, f, ensure_ascii=False)
+
+
+def prepare_dataset(data_dir, emails, models, seed):
+    """
+    Generate the dataset for a scale under `data_dir`, reusing one generated
+    earlier with the same scale and seed.
+    """
+    directory = os.path.join(data_dir, f"{emails}x{models}-seed{seed}")
+    marker = os.path.join(directory, "generated.json")
+    if os.path.exists(marker):
+        print(f"Reusing synthetic data in {directory}")
+        return directory
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    generate_dataset(directory, emails, models, seed)
+    with open(marker, "w") as f:
+        json.dump({"emails": emails, "models": models, "seed": seed}, f)
+    print(
+        f"Generated {emails} emails x {models} models in "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+    return directory
+
+
+def measure(func, *args):
+    """
+    Call `func`, silencing its output. Returns its result and the wall-clock
+    seconds and peak traced memory in MB.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {"seconds": round(elapsed, 4), "peak_mb": round(peak / 1e6, 2)}
+
+
+def run_charts(directory):
+    """
+    Run charts.py against the summary in `directory`, without opening windows.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        runpy.run_path(charts_script, run_name="__main__")
+    finally:
+        os.chdir(cwd)
+        plt.close("all")
+
+
+def run_stages(directory):
+    """
+    Time and memory-profile each stage of the scoring and aggregation
+    pipeline over the dataset in `directory`.
+    """
+    csv_path = os.path.join(directory, "training.csv")
+    json_files = sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.endswith("_prompt2.json")
+    )
+    summary_csv = os.path.join(directory, "summary_all_json.csv")
+    stages = {}
+
+    df_csv, stages["load_training"] = measure(pd.read_csv, csv_path)
+    truth, stages["ground_truth"] = measure(GroundTruth, df_csv)
+    scored, stages["score"] = measure(
+        lambda truth: [score_file(path, truth) for path in json_files], truth
+    )
+    pd.DataFrame([summary for summary, _ in scored]).to_csv(summary_csv, index=False)
+    del df_csv, truth, scored
+
+    _, stages["matrix"] = measure(
+        lambda: create_combined_dataframe(
+            load_training_csv(csv_path), load_json_files(directory)
+        )
+    )
+    _, stages["leaderboard"] = measure(
+        generate_leaderboard_html, summary_csv, os.path.join(directory, "index.html")
+    )
+    _, stages["charts"] = measure(run_charts, directory)
+    return stages
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print each stage against the baseline and return the regressions: stages
+    more than `tolerance` slower or larger than the baseline run at the same
+    scale.
+    """
+    regressions = []
+    print(f"\n{'Scale':<12} {'Stage':<14} {'Seconds':>20} {'Peak MB':>22}")
+    for label, run in results["runs"].items():
+        base = baseline["runs"].get(label)
+        if base is None:
+            print(f"{label:<12} not in baseline")
+            continue
+        for stage, current in run["stages"].items():
+            previous = base["stages"].get(stage)
+            if previous is None:
+                continue
+            cells = []
+            for metric, floor in (("seconds", MIN_SECONDS), ("peak_mb", MIN_MB)):
+                ratio = current[metric] / previous[metric] if previous[metric] else 1.0
+                cells.append(f"{previous[metric]:>8.2f} ->{current[metric]:>8.2f}")
+                if ratio > 1 + tolerance and current[metric] - previous[metric] > floor:
+                    regressions.append(f"{label} {stage} {metric} x{ratio:.2f}")
+            print(f"{label:<12} {stage:<14} {cells[0]:>20} {cells[1]:>22}")
+    return regressions
+
+
+def main(scales, data_dir, output, baseline_path, save_baseline, tolerance, seed):
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "runs": {},
+    }
+    for emails, models in scales:
+        label = f"{emails}x{models}"
+        directory = prepare_dataset(data_dir, emails, models, seed)
+        stages = run_stages(directory)
+        results["runs"][label] = {"emails": emails, "models": models, "stages": stages}
+
+        print(f"\n{label}: {emails} emails x {models} models")
+        for stage, metrics in stages.items():
+            print(
+                f"  {stage:<14} {metrics['seconds']:>9.3f}s  "
+                f"peak {metrics['peak_mb']:>9.1f} MB"
+            )
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\nResults saved to {output}")
+
+    if save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --save-baseline to store one")
+        return 0
+
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions beyond {tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against the baseline")
+    return 0
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark scoring, matrix, leaderboard and chart generation "
+        "on synthetic data"
+    )
+    parser.add_argument(
+        "--scales",
+        nargs="+",
+        type=parse_scale,
+        default=[(1000, 10)],
+        metavar="EMAILSxMODELS",
+        help="Dataset sizes to benchmark, e.g. 1000x10 100000x100 (default 1000x10)",
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="Keep generated datasets here and reuse them (default: a temporary "
+        "directory)",
+    )
+    parser.add_argument(
+        "--output", default="bench_results.json", help="Where to save the results"
+    )
+    parser.add_argument(
+        "--baseline",
+        default="bench_baseline.json",
+        help="Baseline results to compare against",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store these results as the baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Slowdown or memory growth treated as a regression (default 0.25)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    args = parser.parse_args(argv)
+
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        status = main(
+            args.scales,
+            data_dir,
+            args.output,
+            args.baseline,
+            args.save_baseline,
+            args.tolerance,
+            args.seed,
+        )
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(cli())
@@ -0,0 +1,111 @@
+from sqlite_utils import Database
+
+# Index serving the extraction query: the filter columns, then date for the
+# ordering. SQLite appends the rowid, so paging through (date, rowid) is
+# answered from the index alone.
+EMAIL_INDEX = "idx_emails_year_month_disclaimer_date"
+EMAIL_INDEX_COLUMNS = ["year", "month", "disclaimer", "date"]
+
+PAGE_QUERY = """
+select rowid, date from emails
+where year = ? and month = ? and disclaimer = 'True'
+  and (date, rowid) > (?, ?)
+order by date, rowid
+limit ?
+"""
+
+# The (date, rowid) comparison is never true for a NULL date, so emails
+# without one are paged by rowid alone. They come first, as NULLs sort first.
+NULL_DATE_QUERY = """
+select rowid, date from emails
+where year = ? and month = ? and disclaimer = 'True'
+  and date is null and rowid > ?
+order by rowid
+limit ?
+"""
+
+
+def open_database(path="emails.db", wal=True):
+    """
+    Open the emails database and make sure the extraction index exists.
+    With `wal`, the database is switched to write-ahead logging so readers
+    do not block (or get blocked by) the ingester writing new emails.
+    """
+    db = Database(path)
+    if wal:
+        db.enable_wal()
+    if db["emails"].exists():
+        ensure_index(db)
+        check_index(db)
+    return db
+
+
+def ensure_index(db):
+    """
+    Create the extraction index on the emails table if it is missing.
+    """
+    for index in db["emails"].indexes:
+        if index.columns[: len(EMAIL_INDEX_COLUMNS)] == EMAIL_INDEX_COLUMNS:
+            return
+    print(f"Creating index {EMAIL_INDEX} on emails, this may take a while")
+    db["emails"].create_index(
+        EMAIL_INDEX_COLUMNS, index_name=EMAIL_INDEX, if_not_exists=True
+    )
+
+
+def check_index(db):
+    """
+    Return the query plans for the page queries, raising if SQLite would scan
+    the table instead of using a covering index.
+    """
+    plans = []
+    for query, params in [
+        (PAGE_QUERY, [0, 0, "", 0, 1]),
+        (NULL_DATE_QUERY, [0, 0, 0, 1]),
+    ]:
+        plan = " ".join(
+            row[-1] for row in db.execute("explain query plan " + query, params)
+        )
+        if "COVERING INDEX" not in plan:
+            raise RuntimeError(
+                f"Email page query is not using a covering index: {plan}"
+            )
+        plans.append(plan)
+    return "\n".join(plans)
+
+
+def iter_emails(db, year, month, page_size=500, limit=None):
+    """
+    Yield the disclaimer emails for a month in date order, one page at a time.
+
+    Pages are found with keyset pagination on (date, rowid) from the index,
+    so each page costs the same however deep into the month it is, and the
+    full rows are then fetched by rowid. Emails without a date come first,
+    paged by rowid. Stops after `limit` emails if given.
+    """
+    remaining = limit
+    for query, after in [(NULL_DATE_QUERY, [0]), (PAGE_QUERY, ["", 0])]:
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            keys = db.execute(query, [year, month, *after, size]).fetchall()
+            if not keys:
+                break
+
+            rowids = [rowid for rowid, _ in keys]
+            placeholders = ", ".join("?" * len(rowids))
+            rows = {
+                row.pop("_rowid"): row
+                for row in db["emails"].rows_where(
+                    f"rowid in ({placeholders})", rowids, select="rowid as _rowid, *"
+                )
+            }
+            for rowid in rowids:
+                yield rows[rowid]
+
+            last_rowid, last_date = keys[-1]
+            if query is NULL_DATE_QUERY:
+                after = [last_rowid]
+            else:
+                after = [last_date, last_rowid]
+            if remaining is not None:
+                remaining -= len(keys)
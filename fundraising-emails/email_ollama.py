@@ -1,58 +1,642 @@
-import json
+import argparse
+import asyncio
+import os
+import random
+import time
 
-from ollama import ChatResponse, chat
-from sqlite_utils import Database
+from email_db import iter_emails, open_database
+from harness import (
+    PACK_INSTRUCTIONS,
+    PACK_TOKENS,
+    CallTimer,
+    EmailExtraction,
+    FieldStream,
+    ResponseCache,
+    disclaimer_window,
+    extract_committee,
+    format_pack,
+    get_encoding,
+    load_calls,
+    metrics_path,
+    pack,
+    packed_model,
+    parse_pack,
+    print_call_summary,
+    split,
+    summarize_calls,
+)
+from ollama import AsyncClient, ChatResponse
+from ollama_pool import OllamaPool
+from results_io import JsonlWriter, iter_jsonl, jsonl_to_json
 
-model = "mistral-small"
+model = "mistral-small"  # Update this to match your installed model name
 model_file = "mistral_small"
 
+# Ollama constrains decoding to this JSON schema, so replies always parse
+OUTPUT_SCHEMA = EmailExtraction.model_json_schema()
+PACK_MODEL = packed_model(EmailExtraction)
+PACK_SCHEMA = PACK_MODEL.model_json_schema()
 
-def process_email(email):
+# Greedy decoding, so a cached reply is the answer the model would give again
+# rather than one random sample of it
+OPTIONS = {"temperature": 0}
+
+SYSTEM_PROMPT = "Produce a JSON object with the following keys: 'committee', which is the name of the committee in the disclaimer that begins with Paid for by but does not include `Paid for by`, the committee address or the treasurer name. If no committee is present, the value of 'committee' should be None. Also add a key called 'sender', which is the name of the person, if any, mentioned as the author of the email. If there is no person named, the value is None. Do not include any other text, no yapping."
+
+
+async def stream_chat(client, model_name, messages, timer):
+    """
+    Stream a chat reply and stop it as soon as every field of the output
+    schema is complete and valid. Returns the reply text, the final chunk
+    (None if generation was stopped early) and the number of chunks received.
+    """
+    fields = FieldStream(EmailExtraction)
+    chunks = await client.chat(
+        model=model_name,
+        format=OUTPUT_SCHEMA,
+        messages=messages,
+        options=OPTIONS,
+        stream=True,
+    )
+    final = None
+    received = 0
+    try:
+        async for chunk in chunks:
+            timer.first_byte()
+            received += 1
+            if chunk.done:
+                final = chunk
+            if fields.feed(chunk.message.content or ""):
+                break
+    finally:
+        # Closing the connection makes Ollama stop generating
+        await chunks.aclose()
+    return fields.output_text(), final, received
+
+
+async def process_email(
+    client,
+    email,
+    timeout=120,
+    retries=3,
+    backoff=2.0,
+    cache=None,
+    max_input_tokens=0,
+    fast_path=0,
+    model_name=None,
+    metrics=None,
+    queued=None,
+    stream=False,
+):
+    """
+    Extract the committee and sender from a single email and return the
+    parsed fields, using `model_name` or the module's default model.
+
+    Each attempt is bounded by `timeout` seconds; failed attempts are retried
+    with exponential backoff plus jitter. Returns None once retries run out.
+    Successfully parsed responses are stored in `cache`, if one is given.
+    With `max_input_tokens`, only that many tokens around the disclaimer are
+    sent instead of the whole body. With `fast_path`, emails whose disclaimer
+    the rule-based parser reads with at least that confidence are resolved
+    without the model; their sender is left as None.
+
+    One metrics row per email is written to `metrics`, if given, once it
+    succeeds or runs out of retries: the timing and token counts of its
+    final attempt, the retries before it and its outcome ("ok" or "failed"),
+    with queue wait counted from `queued` (a perf_counter time).
+    With `stream`, the reply is streamed and generation stops as soon as the
+    committee and sender are complete.
+    """
+    if fast_path:
+        committee, confidence = extract_committee(email["body"])
+        if confidence >= fast_path:
+            return {"committee": committee, "sender": None, "extracted_by": "rules"}
+
+    body = prepare_body(email, max_input_tokens)
+
+    model_name = model_name or model
+    if cache is not None:
+        cache_key = cache.make_key(
+            model_name, SYSTEM_PROMPT, body, format=OUTPUT_SCHEMA, options=OPTIONS
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": body},
+    ]
+    timer = CallTimer(model_name, queued)
+    parsed_response = None
+    stopped_early = False
+    for attempt in range(retries + 1):
+        timer.attempt()
+        try:
+            if stream:
+                content, response, received = await asyncio.wait_for(
+                    stream_chat(client, model_name, messages, timer),
+                    timeout=timeout,
+                )
+            else:
+                response: ChatResponse = await asyncio.wait_for(
+                    client.chat(
+                        model=model_name,
+                        format=OUTPUT_SCHEMA,
+                        messages=messages,
+                        options=OPTIONS,
+                    ),
+                    timeout=timeout,
+                )
+                content = response.message.content
+            if response is not None:
+                # Ollama reports durations in nanoseconds; the first token
+                # comes once the model is loaded and the prompt evaluated
+                first_token = (response.load_duration or 0) + (
+                    response.prompt_eval_duration or 0
+                )
+                timer.finish(
+                    response.prompt_eval_count,
+                    response.eval_count,
+                    ttfb=first_token / 1e9 or None,
+                )
+            else:
+                # Stopped early, so no counts; each streamed chunk is a token
+                timer.finish(output_tokens=received)
+            stopped_early = response is None
+            # Validate the reply straight from its JSON text
+            parsed_response = EmailExtraction.model_validate_json(content).model_dump()
+            break
+        except Exception as e:
+            if attempt == retries:
+                print(f"Error processing email {email['id']}: {e}")
+                break
+            delay = backoff * 2**attempt + random.uniform(0, backoff)
+            print(
+                f"Retrying email {email['id']} in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{retries}): {e}"
+            )
+            await asyncio.sleep(delay)
+
+    if timer.finished is None:
+        # The final attempt timed out or raised before a reply came back
+        timer.finish()
+    if metrics is not None:
+        metrics.write(
+            timer.row(
+                id=email["id"],
+                stopped_early=stopped_early,
+                outcome="failed" if parsed_response is None else "ok",
+            )
+        )
+    if parsed_response is not None and cache is not None:
+        cache.set(cache_key, parsed_response)
+    return parsed_response
+
+
+def prepare_body(email, max_input_tokens=0):
+    """
+    The part of an email sent to the model: the whole body, or only
+    `max_input_tokens` tokens around the disclaimer.
+    """
+    if max_input_tokens:
+        return disclaimer_window(email["body"], max_input_tokens)
+    return email["body"]
+
+
+async def process_pack(
+    client,
+    emails,
+    timeout=120,
+    retries=3,
+    backoff=2.0,
+    cache=None,
+    max_input_tokens=0,
+    fast_path=0,
+    model_name=None,
+    metrics=None,
+    queued=None,
+):
+    """
+    Extract the committee and sender from several emails with a single
+    request, returning the parsed fields (or None) for each email in order.
+    Emails the fast path resolves are left out of the request. Packed
+    replies are cached under the whole request, apart from single emails.
+
+    A reply that does not answer every email exactly once is split in half
+    and retried, down to single emails. Single emails, and every email of a
+    request that fails outright, go through process_email with its retries.
+    Each packed request writes a metrics row with its outcome: "ok", "split"
+    or "resent". The other arguments are as for process_email.
+    """
+    options = {
+        "timeout": timeout,
+        "retries": retries,
+        "backoff": backoff,
+        "cache": cache,
+        "max_input_tokens": max_input_tokens,
+        "fast_path": fast_path,
+        "model_name": model_name,
+        "metrics": metrics,
+        "queued": queued,
+    }
+    model_name = model_name or model
+    results = [None] * len(emails)
+    pending = []
+    for index, email in enumerate(emails):
+        if fast_path:
+            committee, confidence = extract_committee(email["body"])
+            if confidence >= fast_path:
+                results[index] = {
+                    "committee": committee,
+                    "sender": None,
+                    "extracted_by": "rules",
+                }
+                continue
+        pending.append((index, prepare_body(email, max_input_tokens)))
+
+    if len(pending) == 1:
+        index = pending[0][0]
+        results[index] = await process_email(client, emails[index], **options)
+        return results
+    if not pending:
+        return results
+
+    instructions = SYSTEM_PROMPT + PACK_INSTRUCTIONS
+    body = format_pack([body for _, body in pending])
+    # Keyed on the whole packed request, so packed answers never stand in
+    # for single-email ones or the other way round
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(
+            model_name, instructions, body, format=PACK_SCHEMA, options=OPTIONS
+        )
+        cached = cache.get(cache_key)
+        if cached is not None:
+            for (index, _), parsed_response in zip(pending, cached):
+                results[index] = parsed_response
+            return results
+
+    messages = [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": body},
+    ]
+    timer = CallTimer(model_name, queued)
+
+    def record(outcome):
+        # One row per packed request; its emails' own requests, if it is
+        # split or re-sent, write rows of their own
+        if metrics is not None:
+            metrics.write(
+                timer.row(
+                    id=[emails[index]["id"] for index, _ in pending],
+                    stopped_early=False,
+                    emails=len(pending),
+                    outcome=outcome,
+                )
+            )
+
+    timer.attempt()
     try:
-        response: ChatResponse = chat(
-            model=model,  # Update this to match your installed model name
-            format="json",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "Produce a JSON object with the following keys: 'committee', which is the name of the committee in the disclaimer that begins with Paid for by but does not include `Paid for by`, the committee address or the treasurer name. If no committee is present, the value of 'committee' should be None. Also add a key called 'sender', which is the name of the person, if any, mentioned as the author of the email. If there is no person named, the value is None. Do not include any other text, no yapping.",
-                },
-                {"role": "user", "content": email["body"]},
-            ],
+        # A pack's reply is several emails long, so it gets their time
+        response: ChatResponse = await asyncio.wait_for(
+            client.chat(
+                model=model_name,
+                format=PACK_SCHEMA,
+                messages=messages,
+                options=OPTIONS,
+            ),
+            timeout=timeout * len(pending),
         )
-        # Extract the content from the response
-        response_content = response.message.content
-        # Parse the JSON response
-        parsed_response = json.loads(response_content)
-        return parsed_response | email
     except Exception as e:
-        print(f"Error processing email {email['id']}: {e}")
-        return None
+        timer.finish()
+        record("resent")
+        print(f"Packed request for {len(pending)} emails failed, sending each: {e}")
+        singles = await asyncio.gather(
+            *(process_email(client, emails[index], **options) for index, _ in pending)
+        )
+        for (index, _), result in zip(pending, singles):
+            results[index] = result
+        return results
 
+    timer.finish(response.prompt_eval_count, response.eval_count)
+    try:
+        answers = parse_pack(PACK_MODEL, response.message.content, len(pending))
+    except ValueError as e:
+        record("split")
+        print(f"Splitting a pack of {len(pending)} emails: {e}")
+        halves = split([index for index, _ in pending])
+        answered = await asyncio.gather(
+            *(
+                process_pack(client, [emails[index] for index in half], **options)
+                for half in halves
+            )
+        )
+        for half, half_results in zip(halves, answered):
+            for index, result in zip(half, half_results):
+                results[index] = result
+        return results
+
+    record("ok")
+    parsed_responses = [answer.model_dump(exclude={"id"}) for answer in answers]
+    if cache is not None:
+        cache.set(cache_key, parsed_responses)
+    for (index, _), parsed_response in zip(pending, parsed_responses):
+        results[index] = parsed_response
+    return results
+
+
+def make_client(host):
+    """
+    An Ollama client for `host`, or a pool balancing requests over them if
+    given several hosts.
+    """
+    if isinstance(host, (list, tuple)):
+        if len(host) > 1:
+            return OllamaPool(host)
+        host = host[0]
+    return AsyncClient(host=host)
+
+
+def completed_ids(*paths):
+    """
+    Collect the ids of emails already written to any of the given output files.
+    """
+    ids = set()
+    for path in paths:
+        for record in iter_jsonl(path):
+            ids.add(record["id"])
+    return ids
 
-def main(year, month, name):
-    db = Database("emails.db")
-    entities = []
-    failures = []
 
-    for email in db["emails"].rows_where(
-        f"year = {year} and month = {month} and disclaimer = 'True'",
-        order_by="date",
-        limit=1000,
+async def run_extraction(
+    emails,
+    entities_file,
+    failures_file,
+    workers=4,
+    timeout=120,
+    retries=3,
+    host=None,
+    compact=False,
+    fsync_every=50,
+    cache=None,
+    max_input_tokens=0,
+    fast_path=0,
+    model_name=None,
+    stream=False,
+    pack_size=1,
+    pack_tokens=PACK_TOKENS,
+    json_file=None,
+):
+    """
+    Process emails with a bounded pool of workers, appending each finished
+    email to the entities or failures JSONL file. Emails already in the
+    entities file are skipped, so an interrupted run picks up where it
+    stopped; failed emails are retried, with the failures file started
+    afresh so it lists only the emails that failed this time.
+
+    With `compact`, entities hold only the extracted fields plus the email id,
+    and failures hold only the id, instead of a copy of the whole row. The
+    timing of every model call is appended to a metrics file next to the
+    entities file and summarized at the end.
+    `max_input_tokens`, `fast_path`, `model_name` and `stream` are passed on
+    to process_email. `host` may be a list of Ollama endpoints to spread the
+    requests over. With a `pack_size` above 1, up to that many emails whose
+    inputs fit in `pack_tokens` tokens share a request (see process_pack);
+    `stream` then only applies to emails sent on their own.
+
+    With `json_file`, the finished entities are also written there as a JSON
+    array, the format the scoring scripts read.
+    """
+    done = completed_ids(entities_file)
+    if done:
+        print(f"Resuming: {len(done)} emails already extracted")
+    if os.path.exists(failures_file):
+        os.remove(failures_file)
+
+    client = make_client(host)
+    queue = asyncio.Queue(maxsize=workers * 2)
+    processed = 0
+
+    calls_file = metrics_path(entities_file)
+    with (
+        JsonlWriter(entities_file, fsync_every) as entities,
+        JsonlWriter(failures_file, fsync_every) as failures,
+        JsonlWriter(calls_file, fsync_every) as metrics,
     ):
-        print(email["subject"])
-        result = process_email(email)
-        if result:
-            entities.append(result)
-        else:
-            failures.append(email)
-
-    # Save initial results
-    entities_file = f"{model_file}_{name}_{year}.json"
-    failures_file = f"{model_file}_{name}_{year}_failures.json"
-
-    with open(entities_file, "w") as file:
-        json.dump(entities, file, indent=4)
-
-    with open(failures_file, "w") as file:
-        json.dump(failures, file, indent=4)
+
+        async def worker():
+            nonlocal processed
+            while True:
+                group, queued = await queue.get()
+                try:
+                    for email in group:
+                        print(email["subject"])
+                    options = {
+                        "cache": cache,
+                        "max_input_tokens": max_input_tokens,
+                        "fast_path": fast_path,
+                        "model_name": model_name,
+                        "metrics": metrics,
+                        "queued": queued,
+                    }
+                    if len(group) == 1:
+                        result = await process_email(
+                            client, group[0], timeout, retries, stream=stream, **options
+                        )
+                        results = [result]
+                    else:
+                        results = await process_pack(
+                            client, group, timeout, retries, **options
+                        )
+                    for email, result in zip(group, results):
+                        if result is None:
+                            failures.write({"id": email["id"]} if compact else email)
+                        elif compact:
+                            entities.write({"id": email["id"]} | result)
+                        else:
+                            entities.write(result | email)
+                    processed += len(group)
+                finally:
+                    queue.task_done()
+
+        tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+        try:
+            remaining = (email for email in emails if email["id"] not in done)
+            groups = pack(
+                remaining,
+                pack_size,
+                pack_tokens,
+                lambda email: prepare_body(email, max_input_tokens),
+            )
+            for group in groups:
+                await queue.put((group, time.perf_counter()))
+            await queue.join()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if isinstance(client, OllamaPool):
+                await client.close()
+                print(f"Ollama endpoints: {client.stats()}")
+
+    if json_file is not None:
+        count = jsonl_to_json(entities_file, json_file)
+        print(f"Wrote {count} entities to {json_file}")
+
+    calls = load_calls(calls_file)
+    if calls:
+        print_call_summary(summarize_calls(calls))
+    return processed
+
+
+def main(
+    year,
+    month,
+    name,
+    workers=4,
+    timeout=120,
+    retries=3,
+    host=None,
+    compact=False,
+    cache_path="response_cache.sqlite",
+    max_input_tokens=0,
+    fast_path=0,
+    db_path="emails.db",
+    limit=1000,
+    page_size=500,
+    stream=False,
+    pack_size=1,
+    pack_tokens=PACK_TOKENS,
+):
+    db = open_database(db_path)
+    cache = ResponseCache(cache_path) if cache_path else None
+    if max_input_tokens:
+        # Load the tokenizer before any email is sent
+        get_encoding()
+
+    # Read in index-backed pages rather than one large query; `limit` caps
+    # the number of emails and None processes the whole month
+    emails = iter_emails(db, year, month, page_size=page_size, limit=limit)
+
+    # Results are streamed to JSON Lines files as each email completes, then
+    # the entities are converted to the JSON file the scoring scripts read.
+    # Compact entities lack the columns scoring matches on, so they are not.
+    entities_file = f"{model_file}_{name}_{year}.jsonl"
+    json_file = None if compact else f"{model_file}_{name}_{year}.json"
+    failures_file = f"{model_file}_{name}_{year}_failures.jsonl"
+
+    processed = asyncio.run(
+        run_extraction(
+            emails,
+            entities_file,
+            failures_file,
+            workers,
+            timeout,
+            retries,
+            host,
+            compact,
+            cache=cache,
+            max_input_tokens=max_input_tokens,
+            fast_path=fast_path,
+            stream=stream,
+            pack_size=pack_size,
+            pack_tokens=pack_tokens,
+            json_file=json_file,
+        )
+    )
+    print(f"Processed {processed} emails into {entities_file}")
+    if cache is not None:
+        print(f"Response cache: {cache.stats()}")
+        cache.close()
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract committees and senders from one month of emails"
+    )
+    parser.add_argument("year", type=int, help="Year of the emails")
+    parser.add_argument("month", type=int, help="Month of the emails")
+    parser.add_argument("name", help="Label used in the output file names")
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Concurrent requests to Ollama"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=120, help="Seconds allowed per attempt"
+    )
+    parser.add_argument("--retries", type=int, default=3, help="Retries per email")
+    parser.add_argument(
+        "--host",
+        nargs="+",
+        help="Ollama endpoint, or several to balance requests over "
+        "(default: the local one)",
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Write only ids and extracted fields"
+    )
+    parser.add_argument(
+        "--cache",
+        default="response_cache.sqlite",
+        help="Response cache file; pass an empty string to disable it",
+    )
+    parser.add_argument(
+        "--max-input-tokens",
+        type=int,
+        default=0,
+        help="Send only this many tokens around each disclaimer "
+        "(0 sends the whole body)",
+    )
+    parser.add_argument(
+        "--fast-path",
+        type=float,
+        default=0,
+        help="Resolve emails the rule-based parser reads with at least this "
+        "confidence without the model (0 disables it)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream replies and stop each one as soon as its fields are complete",
+    )
+    parser.add_argument(
+        "--pack",
+        type=int,
+        default=1,
+        help="Send up to this many emails per request (1 sends each on its own)",
+    )
+    parser.add_argument(
+        "--pack-tokens",
+        type=int,
+        default=PACK_TOKENS,
+        help="Most input tokens a packed request may carry",
+    )
+    parser.add_argument("--db", default="emails.db", help="Emails database")
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=1000,
+        help="Maximum number of emails; 0 processes the whole month",
+    )
+    args = parser.parse_args(argv)
+    main(
+        args.year,
+        args.month,
+        args.name,
+        args.workers,
+        args.timeout,
+        args.retries,
+        args.host,
+        args.compact,
+        cache_path=args.cache,
+        max_input_tokens=args.max_input_tokens,
+        fast_path=args.fast_path,
+        db_path=args.db,
+        limit=args.limit or None,
+        stream=args.stream,
+        pack_size=args.pack,
+        pack_tokens=args.pack_tokens,
+    )
+
+
+if __name__ == "__main__":
+    cli()
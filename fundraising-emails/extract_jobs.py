@@ -0,0 +1,220 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+
+from email_db import iter_emails, open_database
+from email_ollama import completed_ids, run_extraction
+from harness import ResponseCache
+
+# Shard outputs go under here, one directory per model
+shards_directory = "shards"
+
+
+def month_range(start, end):
+    """
+    List the (year, month) pairs from `start` to `end` inclusive, both given
+    as 'YYYY-MM'.
+    """
+    year, month = map(int, start.split("-"))
+    end_year, end_month = map(int, end.split("-"))
+    months = []
+    while (year, month) <= (end_year, end_month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def model_label(model):
+    """
+    A filename-safe label for a model, e.g. 'qwen2.5:14b' -> 'qwen2_5_14b'.
+    """
+    return re.sub(r"[^0-9A-Za-z]+", "_", model).strip("_")
+
+
+class Shard:
+    """
+    One model's extraction for one month, with its own output files and a
+    marker file written once it has finished.
+    """
+
+    def __init__(self, model, year, month, directory=shards_directory):
+        self.model = model
+        self.year = year
+        self.month = month
+        stem = Path(directory) / model_label(model) / f"{year}-{month:02d}"
+        self.entities_file = f"{stem}.jsonl"
+        self.failures_file = f"{stem}_failures.jsonl"
+        self.done_file = f"{stem}.done.json"
+
+    def __repr__(self):
+        return f"{self.model} {self.year}-{self.month:02d}"
+
+    def is_done(self):
+        return os.path.exists(self.done_file)
+
+    def mark_done(self, summary):
+        # Written atomically, so a marker always means the shard finished
+        temporary = f"{self.done_file}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(summary, f, indent=4)
+        os.replace(temporary, self.done_file)
+
+
+def plan_shards(models, months, directory=shards_directory):
+    """
+    Split the models and months into shards, leaving out finished ones.
+    """
+    shards = [
+        Shard(model, year, month, directory)
+        for model in models
+        for year, month in months
+    ]
+    pending = [shard for shard in shards if not shard.is_done()]
+    print(
+        f"{len(shards)} shards, {len(shards) - len(pending)} already done, "
+        f"{len(pending)} to run"
+    )
+    return pending
+
+
+async def run_shard(
+    shard, db, host, cache, workers, timeout, retries, compact, stream=False
+):
+    """
+    Extract every disclaimer email of the shard's month with its model, then
+    mark the shard done. Raises if every email failed.
+    """
+    os.makedirs(os.path.dirname(shard.entities_file), exist_ok=True)
+    # An unfinished shard keeps its extracted emails but retries its failures
+    start = time.perf_counter()
+    processed = await run_extraction(
+        iter_emails(db, shard.year, shard.month),
+        shard.entities_file,
+        shard.failures_file,
+        workers,
+        timeout,
+        retries,
+        host,
+        compact,
+        cache=cache,
+        model_name=shard.model,
+        stream=stream,
+    )
+    extracted = len(completed_ids(shard.entities_file))
+    failures = len(completed_ids(shard.failures_file))
+    if failures and not extracted:
+        # Most likely the endpoint or model is unavailable, not the emails
+        raise RuntimeError(f"all {failures} emails failed")
+    shard.mark_done(
+        {
+            "model": shard.model,
+            "year": shard.year,
+            "month": shard.month,
+            "host": host,
+            "processed": processed,
+            "extracted": extracted,
+            "failures": failures,
+            "seconds": round(time.perf_counter() - start, 1),
+        }
+    )
+    print(f"Finished shard {shard} on {host or 'default host'}: {processed} emails")
+
+
+async def run_shards(
+    shards,
+    hosts,
+    db_path="emails.db",
+    workers=4,
+    timeout=120,
+    retries=3,
+    compact=False,
+    cache_path="response_cache.sqlite",
+    stream=False,
+):
+    """
+    Run shards across Ollama endpoints. Each endpoint takes the next pending
+    shard as soon as it finishes one, so faster machines do more of the work.
+    A shard that fails is left unmarked and runs again next time.
+    """
+    db = open_database(db_path)
+    cache = ResponseCache(cache_path) if cache_path else None
+    queue = asyncio.Queue()
+    for shard in shards:
+        queue.put_nowait(shard)
+    failed = []
+
+    async def endpoint(host):
+        while not queue.empty():
+            shard = queue.get_nowait()
+            print(f"Starting shard {shard} on {host or 'default host'}")
+            try:
+                await run_shard(
+                    shard, db, host, cache, workers, timeout, retries, compact, stream
+                )
+            except Exception as e:
+                print(f"Shard {shard} failed on {host or 'default host'}: {e!r}")
+                failed.append(shard)
+
+    await asyncio.gather(*(endpoint(host) for host in hosts))
+    if cache is not None:
+        print(f"Response cache: {cache.stats()}")
+        cache.close()
+    return failed
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract committees for a range of months and models, "
+        "one output file per model and month"
+    )
+    parser.add_argument("--start", required=True, help="First month, as YYYY-MM")
+    parser.add_argument("--end", required=True, help="Last month, as YYYY-MM")
+    parser.add_argument(
+        "--models", nargs="+", required=True, help="Ollama model names to run"
+    )
+    parser.add_argument(
+        "--hosts",
+        nargs="+",
+        default=[None],
+        help="Ollama endpoints to spread shards over (default: the local one)",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=4, help="Concurrent requests per endpoint"
+    )
+    parser.add_argument("--db", default="emails.db", help="Emails database")
+    parser.add_argument(
+        "--output-dir", default=shards_directory, help="Directory for shard outputs"
+    )
+    parser.add_argument(
+        "--compact", action="store_true", help="Write only ids and extracted fields"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream replies and stop each one as soon as its fields are complete",
+    )
+    args = parser.parse_args(argv)
+
+    shards = plan_shards(
+        args.models, month_range(args.start, args.end), args.output_dir
+    )
+    failed = asyncio.run(
+        run_shards(
+            shards,
+            args.hosts,
+            args.db,
+            args.workers,
+            compact=args.compact,
+            stream=args.stream,
+        )
+    )
+    if failed:
+        print(f"{len(failed)} shards failed and will run again next time: {failed}")
+
+
+if __name__ == "__main__":
+    cli()
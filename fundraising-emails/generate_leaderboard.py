@@ -1,37 +1,91 @@
 #!/usr/bin/env python3
+import argparse
+import csv
 from datetime import datetime
 
-import pandas as pd
+# Summary columns read as numbers; the rest stay text
+INTEGER_COLUMNS = ["Total Records", "Committee Matches"]
+FLOAT_COLUMNS = ["Accuracy", "Precision", "Recall", "F1 Score"]
+SPEED_COLUMNS = ["latency_p50", "tokens_per_second", "total_cost"]
 
 
-def generate_leaderboard_html(summary_csv_path, output_path):
+def read_rows(path):
+    # The summaries are a few dozen rows, not worth importing pandas for
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def format_speed(value, template):
+    return "-" if value in (None, "") else template.format(float(value))
+
+
+def generate_leaderboard_html(summary_csv_path, output_path, speed_csv_path=None):
     """
     Generate an HTML leaderboard from the summary CSV file,
     with sections for Updated Prompt and Original Prompt.
     :param summary_csv_path: Path to the summary CSV file
     :param output_path: Path to save the output HTML file
+    :param speed_csv_path: Optional speed summary CSV written by
+        call_metrics.py, adding latency, throughput and cost columns
     """
     # Read the summary CSV
     try:
-        df = pd.read_csv(summary_csv_path)
+        rows = read_rows(summary_csv_path)
+        for row in rows:
+            for column in INTEGER_COLUMNS:
+                row[column] = int(row[column])
+            for column in FLOAT_COLUMNS:
+                row[column] = float(row[column])
     except Exception as e:
         print(f"Error reading CSV: {e}")
         return
 
-    # Separate dataframes for updated and original prompts
-    df_updated = df[df["JSON Filename"].str.contains("prompt2", case=False)].copy()
-    df_original = df[~df["JSON Filename"].str.contains("prompt2", case=False)].copy()
+    # Join per-file speed and cost, for the models that have it
+    show_speed = False
+    if speed_csv_path:
+        try:
+            speed = {row["JSON Filename"]: row for row in read_rows(speed_csv_path)}
+        except Exception as e:
+            print(f"Error reading speed CSV: {e}")
+        else:
+            # Local models have no cost column, which is left empty
+            for row in rows:
+                match = speed.get(row["JSON Filename"], {})
+                for column in SPEED_COLUMNS:
+                    row[column] = match.get(column)
+            show_speed = True
 
-    # Sort both dataframes
-    df_updated = df_updated.sort_values(
-        by=["Total Records", "Committee Matches"], ascending=[False, False]
-    )
-    df_original = df_original.sort_values(
-        by=["Total Records", "Committee Matches"], ascending=[False, False]
-    )
+    # Separate lists for updated and original prompts, each sorted
+    def ranked(updated):
+        return sorted(
+            (
+                row
+                for row in rows
+                if ("prompt2" in row["JSON Filename"].lower()) == updated
+            ),
+            key=lambda row: (-row["Total Records"], -row["Committee Matches"]),
+        )
+
+    rows_updated = ranked(True)
+    rows_original = ranked(False)
+
+    speed_headers = ""
+    if show_speed:
+        speed_headers = """
+                <th>p50 Latency</th>
+                <th>Tokens/s</th>
+                <th>Cost</th>"""
+
+    def speed_cells(row):
+        if not show_speed:
+            return ""
+        return f"""
+            <td>{format_speed(row["latency_p50"], "{:.2f}s")}</td>
+            <td>{format_speed(row["tokens_per_second"], "{:.1f}")}</td>
+            <td>{format_speed(row["total_cost"], "${:.4f}")}</td>"""
 
     # Function to generate table rows
-    def generate_table_rows(dataframe):
+    def generate_table_rows(rows):
         return "".join(
             [
                 f"""
@@ -43,9 +97,9 @@ def generate_leaderboard_html(summary_csv_path, output_path):
             <td>{row["Accuracy"]:.2f}</td>
             <td>{row["Precision"]:.2f}</td>
             <td>{row["Recall"]:.2f}</td>
-            <td>{row["F1 Score"]:.2f}</td>
+            <td>{row["F1 Score"]:.2f}</td>{speed_cells(row)}
         </tr>"""
-                for _, row in dataframe.iterrows()
+                for row in rows
             ]
         )
 
@@ -120,11 +174,11 @@ def generate_leaderboard_html(summary_csv_path, output_path):
                 <th>Accuracy</th>
                 <th>Precision</th>
                 <th>Recall</th>
-                <th>F1 Score</th>
+                <th>F1 Score</th>{speed_headers}
             </tr>
         </thead>
         <tbody>
-{generate_table_rows(df_updated)}
+{generate_table_rows(rows_updated)}
         </tbody>
     </table>
 
@@ -139,11 +193,11 @@ def generate_leaderboard_html(summary_csv_path, output_path):
                 <th>Accuracy</th>
                 <th>Precision</th>
                 <th>Recall</th>
-                <th>F1 Score</th>
+                <th>F1 Score</th>{speed_headers}
             </tr>
         </thead>
         <tbody>
-{generate_table_rows(df_original)}
+{generate_table_rows(rows_original)}
         </tbody>
     </table>
 
@@ -159,8 +213,28 @@ def generate_leaderboard_html(summary_csv_path, output_path):
     print(f"Leaderboard HTML generated at {output_path}")
 
 
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate the HTML leaderboard from the scoring summary"
+    )
+    parser.add_argument(
+        "--summary",
+        default="fundraising-emails/summary_all_json.csv",
+        help="Summary CSV written by matcher.py",
+    )
+    parser.add_argument(
+        "--output",
+        default="fundraising-emails/index.html",
+        help="Where to write the leaderboard HTML",
+    )
+    parser.add_argument(
+        "--speed",
+        help="Speed summary CSV from call_metrics.py --output, to show latency, "
+        "throughput and cost next to accuracy",
+    )
+    args = parser.parse_args(argv)
+    generate_leaderboard_html(args.summary, args.output, args.speed)
+
+
 if __name__ == "__main__":
-    # Default paths, can be modified as needed
-    summary_csv_path = "fundraising-emails/summary_all_json.csv"
-    output_html_path = "fundraising-emails/index.html"
-    generate_leaderboard_html(summary_csv_path, output_html_path)
+    cli()
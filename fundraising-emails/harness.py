@@ -0,0 +1,62 @@
+"""
+Helpers shared with the benchmarking harness.
+
+The scripts here run from this directory, where ../benchmarking is not
+importable, so this is the one module that reaches it. The harness is
+imported as the `benchmarking` package, so its module names (`models` in
+particular) never go on the path by themselves, and the scripts import the
+helpers from here.
+"""
+
+import sys
+from pathlib import Path
+
+root_directory = str(Path(__file__).resolve().parent.parent)
+if root_directory not in sys.path:
+    sys.path.append(root_directory)
+
+from benchmarking.call_metrics import (  # noqa: E402
+    CallTimer,
+    load_calls,
+    metrics_path,
+    print_call_summary,
+    summarize_calls,
+)
+from benchmarking.disclaimer_parser import (  # noqa: E402
+    DEFAULT_THRESHOLD,
+    extract_committee,
+)
+from benchmarking.models import EmailExtraction, packed_model  # noqa: E402
+from benchmarking.packing import (  # noqa: E402
+    PACK_INSTRUCTIONS,
+    PACK_TOKENS,
+    format_pack,
+    pack,
+    parse_pack,
+    split,
+)
+from benchmarking.response_cache import ResponseCache  # noqa: E402
+from benchmarking.stream_parser import FieldStream  # noqa: E402
+from benchmarking.token_budget import disclaimer_window, get_encoding  # noqa: E402
+
+__all__ = [
+    "DEFAULT_THRESHOLD",
+    "PACK_INSTRUCTIONS",
+    "PACK_TOKENS",
+    "CallTimer",
+    "EmailExtraction",
+    "FieldStream",
+    "ResponseCache",
+    "disclaimer_window",
+    "extract_committee",
+    "format_pack",
+    "get_encoding",
+    "load_calls",
+    "metrics_path",
+    "pack",
+    "packed_model",
+    "parse_pack",
+    "print_call_summary",
+    "split",
+    "summarize_calls",
+]
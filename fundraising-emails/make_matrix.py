@@ -1,8 +1,11 @@
+import argparse
 import glob
-import json
 import os
 
+import numpy as np
 import pandas as pd
+from results_io import load_records
+from results_store import load_model_frames
 
 
 def extract_model_name(filename):
@@ -42,7 +45,7 @@ def load_json_files(directory="."):
     Load all JSON files ending in _prompt2.json from the specified directory
     """
     pattern = os.path.join(directory, "*_prompt2.json")
-    json_files = glob.glob(pattern)
+    json_files = sorted(glob.glob(pattern))
 
     if not json_files:
         print(f"No files found matching pattern: {pattern}")
@@ -54,9 +57,7 @@ def load_json_files(directory="."):
         print(f"Processing {file_path} -> {model_name}")
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                json_data = json.load(f)
-                data[model_name] = json_data
+            data[model_name] = load_records(file_path, fields=PREDICTION_FIELDS)
         except Exception as e:
             print(f"Error loading {file_path}: {e}")
             continue
@@ -64,6 +65,95 @@ def load_json_files(directory="."):
     return data
 
 
+def load_store_predictions(store):
+    """
+    Load the _prompt2 predictions from a columnar results store, in the same
+    shape load_json_files returns
+    """
+    frames = load_model_frames(store, fields=PREDICTION_FIELDS)
+
+    data = {}
+    for json_filename, frame in frames.items():
+        if not json_filename.endswith("_prompt2.json"):
+            continue
+        model_name = extract_model_name(json_filename)
+        print(f"Processing {json_filename} -> {model_name}")
+        # Missing values come back as NaN; the JSON files hold null, read as
+        # None, which is what the matching and counting expect
+        frame = frame.astype(object).where(frame.notna(), None)
+        data[model_name] = frame.to_dict("records")
+
+    return data
+
+
+# Join keys tried in order when matching model output back to training rows.
+# Fields in STRINGIFIED_KEY_FIELDS are compared as strings, since the model
+# JSON stores them as text while the training CSV stores them as integers.
+MATCH_KEYS = [
+    ["subject", "date", "name"],
+    ["subject", "date", "email"],
+    ["subject", "year", "month", "day"],
+]
+STRINGIFIED_KEY_FIELDS = {"year", "month", "day"}
+
+# The only fields read from each model output file
+PREDICTION_FIELDS = sorted({field for keys in MATCH_KEYS for field in keys}) + [
+    "committee"
+]
+
+
+def build_key_index(columns, fields):
+    """
+    Build an index of key tuples over the given fields, along with a mask of
+    the rows whose keys are complete (no missing values) and can be matched.
+    """
+    arrays = []
+    valid = np.ones(len(columns[fields[0]]), dtype=bool)
+    for field in fields:
+        values = columns[field]
+        if field in STRINGIFIED_KEY_FIELDS:
+            values = np.array([str(value) for value in values], dtype=object)
+        else:
+            values = np.asarray(values, dtype=object)
+            valid &= pd.notna(values)
+        arrays.append(values)
+    keys = pd.Index(list(zip(*arrays)), dtype=object, tupleize_cols=False)
+    return keys, valid
+
+
+def match_predictions(training_keys, emails):
+    """
+    Find the model prediction for each training row.
+
+    `training_keys` holds one (key index, valid mask) pair per entry in
+    MATCH_KEYS. Each tier is a hash join against the first email carrying that
+    key; rows left unmatched fall through to the next tier. Returns the
+    position of the matched email for each training row, or -1.
+    """
+    columns = {
+        field: [email.get(field, "") for email in emails]
+        for field in PREDICTION_FIELDS
+        if field != "committee"
+    }
+
+    matched = np.full(len(training_keys[0][0]), -1, dtype=np.int64)
+    for keys, (train_index, train_valid) in zip(MATCH_KEYS, training_keys):
+        email_index, email_valid = build_key_index(columns, keys)
+        positions = np.flatnonzero(email_valid)
+        email_index = email_index[positions]
+
+        # Keep the first email for each key, as the per-email mapping did
+        first = ~email_index.duplicated(keep="first")
+        lookup = email_index[first]
+        positions = positions[first]
+
+        found = lookup.get_indexer(train_index)
+        fill = (matched == -1) & (found >= 0) & train_valid
+        matched[fill] = positions[found[fill]]
+
+    return matched
+
+
 def create_combined_dataframe(training_df, json_data):
     """
     Create a combined dataframe with training data as base and model predictions
@@ -96,86 +186,57 @@ def create_combined_dataframe(training_df, json_data):
         lambda x: str(x).upper() if pd.notna(x) else None
     )
 
+    # Index the training rows once for every key tier
+    training_columns = {
+        field: training_df[field].to_numpy()
+        for field in {field for keys in MATCH_KEYS for field in keys}
+    }
+    training_keys = [build_key_index(training_columns, keys) for keys in MATCH_KEYS]
+
     # Add model predictions
+    predictions = {}
     for model_name, emails in json_data.items():
         print(f"Processing model: {model_name} with {len(emails)} emails")
 
-        # Create a mapping from email attributes to committee prediction
-        committee_mapping = {}
-        matches_found = 0
-
-        for email in emails:
-            # Try multiple matching strategies
-            keys_to_try = [
-                (
-                    email.get("subject", ""),
-                    email.get("date", ""),
-                    email.get("name", ""),
-                ),
-                (
-                    email.get("subject", ""),
-                    email.get("date", ""),
-                    email.get("email", ""),
-                ),
-                (
-                    email.get("subject", ""),
-                    str(email.get("year", "")),
-                    str(email.get("month", "")),
-                    str(email.get("day", "")),
-                ),
-            ]
-
-            committee_value = email.get("committee", None)
-            if committee_value is not None:
-                committee_value = str(committee_value).upper()
-
-            for key in keys_to_try:
-                if key not in committee_mapping:
-                    committee_mapping[key] = committee_value
-
-        # Create the column with default None values
-        df[model_name] = None
-
-        # Try to match each row in the training data
-        for idx, row in df.iterrows():
-            keys_to_try = [
-                (row.get("subject", ""), row.get("date", ""), row.get("name", "")),
-                (row.get("subject", ""), row.get("date", ""), row.get("email", "")),
-                (
-                    row.get("subject", ""),
-                    str(row.get("year", "")),
-                    str(row.get("month", "")),
-                    str(row.get("day", "")),
-                ),
+        committees = np.array(
+            [
+                str(email["committee"]).upper()
+                if email.get("committee") is not None
+                else None
+                for email in emails
             ]
-
-            for key in keys_to_try:
-                if key in committee_mapping:
-                    df.at[idx, model_name] = committee_mapping[key]
-                    matches_found += 1
-                    break
-
-        print(f"  Found {matches_found} matches for {model_name}")
+            + [None],
+            dtype=object,
+        )
+        # Unmatched rows (-1) pick up the trailing None
+        matched = match_predictions(training_keys, emails)
+        predictions[model_name] = committees[matched]
+
+        print(f"  Found {int((matched >= 0).sum())} matches for {model_name}")
+
+    model_columns = list(predictions)
+    df = pd.concat(
+        [
+            df.drop(columns=[col for col in model_columns if col in df.columns]),
+            pd.DataFrame(predictions, index=df.index, dtype=object),
+        ],
+        axis=1,
+    )
 
     # Add a count column for non-None model predictions
-    model_columns = [
-        col for col in df.columns if col not in keep_columns + ["committee"]
-    ]
-    df["model_count"] = df[model_columns].notna().sum(axis=1)
+    values = df[model_columns].to_numpy(dtype=object)
+    df["model_count"] = pd.notna(values).sum(axis=1)
 
     # Add a count column for exact matches to the canonical committee value
-    def count_matches(row):
-        canonical = row["committee"]
-        if pd.isna(canonical):
-            return 0
-        return sum(1 for col in model_columns if row[col] == canonical)
-
-    df["exact_matches"] = df.apply(count_matches, axis=1)
+    canonical = df["committee"].to_numpy(dtype=object)
+    exact_matches = (values == canonical[:, None]).sum(axis=1)
+    exact_matches[pd.isna(canonical)] = 0
+    df["exact_matches"] = exact_matches
 
     return df
 
 
-def main():
+def main(store=None):
     """
     Main function to process training CSV and JSON files to create combined CSV
     """
@@ -186,8 +247,11 @@ def main():
     if training_df is None:
         return
 
-    # Load all JSON files
-    json_data = load_json_files()
+    # Load all JSON files, or the same predictions from a results store
+    if store:
+        json_data = load_store_predictions(store)
+    else:
+        json_data = load_json_files()
 
     if not json_data:
         print("No JSON files found. Creating CSV with just training data.")
@@ -214,5 +278,17 @@ def main():
     print(df.head(3))
 
 
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Combine training data and model predictions into one matrix"
+    )
+    parser.add_argument(
+        "--store",
+        help="Read predictions from a results store directory instead of JSON files",
+    )
+    args = parser.parse_args(argv)
+    main(store=args.store)
+
+
 if __name__ == "__main__":
-    main()
+    cli()
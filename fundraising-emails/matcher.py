@@ -1,124 +1,406 @@
+import argparse
+import hashlib
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
+from harness import DEFAULT_THRESHOLD, extract_committee
+from results_io import load_records
+from results_store import load_model_frames
 from sklearn.metrics import (
     accuracy_score,
     classification_report,
     precision_recall_fscore_support,
 )
 
+# Paths are resolved relative to this script so it can be run from anywhere
+base_directory = os.path.dirname(os.path.abspath(__file__))
+
 # Load the CSV file
-csv_file = "fundraising-emails/training.csv"
-df_csv = pd.read_csv(csv_file)
+csv_file = os.path.join(base_directory, "training.csv")
 
 # Directory containing JSON files
-json_directory = "."
-model_scores = []
+json_directory = base_directory
+evals_directory = os.path.join(base_directory, "evals")
+
+# Manifest of already-scored files, used to skip files that have not changed
+manifest_file = os.path.join(evals_directory, "manifest.json")
 
 # Columns to merge on
 merge_columns = ["email", "subject", "year", "month", "day", "hour", "minute", "domain"]
 
-# Initialize a list to store summary data
-summary_data = []
 
-# Make sure the evals directory exists
-os.makedirs("evals", exist_ok=True)
+def file_hash(path):
+    """
+    Return the SHA-256 hex digest of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-# Process each JSON file in the directory
-for json_filename in os.listdir(json_directory):
-    if json_filename.endswith(".json"):
-        json_file_path = os.path.join(json_directory, json_filename)
 
-        # Load the JSON file
-        with open(json_file_path, "r") as f:
-            data_json = json.load(f)
-        df_json = pd.DataFrame(data_json)
+def file_fingerprint(path, previous=None):
+    """
+    Return the mtime, size and content hash of a file. The hash from a
+    previous fingerprint is reused when mtime and size are unchanged.
+    """
+    stat = os.stat(path)
+    fingerprint = {"mtime": stat.st_mtime, "size": stat.st_size}
+    if (
+        previous
+        and previous["mtime"] == fingerprint["mtime"]
+        and previous["size"] == fingerprint["size"]
+    ):
+        fingerprint["sha256"] = previous["sha256"]
+    else:
+        fingerprint["sha256"] = file_hash(path)
+    return fingerprint
 
-        # Ensure consistent data types and clean data
-        for col in merge_columns:
-            if col in df_csv.columns and col in df_json.columns:
-                df_csv[col] = df_csv[col].astype(str).str.strip().str.lower()
-                df_json[col] = df_json[col].astype(str).str.strip().str.lower()
 
-        # Merge CSV and JSON data on specified attributes
-        merged = pd.merge(
-            df_csv, df_json, on=merge_columns, how="inner", suffixes=("_csv", "_json")
-        )
+def load_manifest(path):
+    """
+    Load the scoring manifest, or return an empty one if none exists.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"training": None, "files": {}}
 
-        # Ensure the suffixed `committee` columns exist before comparison
-        if "committee_csv" in merged.columns and "committee_json" in merged.columns:
-            y_true = (
-                merged["committee_csv"]
-                .fillna("none")
-                .astype(str)
-                .str.lower()
-                .str.strip()
-            )
-            y_pred = (
-                merged["committee_json"]
-                .fillna("none")
-                .astype(str)
-                .str.lower()
-                .str.strip()
-            )
-            merged["committee_match"] = y_true == y_pred
-        else:
-            merged["committee_match"] = False
-
-        # Calculate the statistics
-        num_records = len(merged)
-        num_matches = merged["committee_match"].sum()
-        y_true = merged["committee_csv"].fillna("none").astype(str).str.lower()
-        y_pred = merged["committee_json"].fillna("none").astype(str).str.lower()
-        precision, recall, f1, *_ = precision_recall_fscore_support(
-            y_true, y_pred, average="macro", zero_division=0
-        )
-        accuracy = accuracy_score(y_true, y_pred)
 
-        # Append the results to the summary data
-        summary_data.append(
-            {
-                "JSON Filename": json_filename,
-                "Total Records": num_records,
-                "Committee Matches": int((y_true == y_pred).sum()),
-                "Accuracy": accuracy,
-                "Precision": precision,
-                "Recall": recall,
-                "F1 Score": f1,
-            }
+def report_path(json_filename):
+    return os.path.join(
+        evals_directory,
+        f"classification_report_{json_filename.replace('.json', '')}.json",
+    )
+
+
+def normalize_keys(df):
+    """
+    Normalize the merge columns and combine them into a single join key.
+    """
+    columns = [df[col].astype(str).str.strip().str.lower() for col in merge_columns]
+    return columns[0].str.cat(columns[1:], sep="\x1f")
+
+
+class GroundTruth:
+    """
+    Training labels, normalized once and indexed on the merge key so that each
+    model output file only pays for normalizing its own rows.
+    """
+
+    def __init__(self, df_csv):
+        committee = df_csv["committee"].fillna("none").astype(str).str.lower()
+        self.labels = pd.DataFrame(
+            {"committee_csv": committee.to_numpy()},
+            index=pd.Index(normalize_keys(df_csv), name="key"),
         )
+        self.bodies = df_csv["body"].fillna("").astype(str).to_numpy()
+        self.rule_labels = None
 
-        model_scores.append(
+    @classmethod
+    def from_csv(cls, path):
+        return cls(pd.read_csv(path))
+
+    def merge(self, df_json, labels):
+        predictions = pd.DataFrame(
             {
-                "JSON Filename": json_filename,
-                "Total Records": len(merged),
-                "Committee Matches": int((y_true == y_pred).sum()),
-                "Accuracy": accuracy,
-                "Precision": precision,
-                "Recall": recall,
-                "F1 Score": f1,
+                "key": normalize_keys(df_json).to_numpy(),
+                "committee_json": (
+                    df_json["committee"]
+                    if "committee" in df_json.columns
+                    else pd.Series(None, index=df_json.index, dtype=object)
+                ).to_numpy(),
             }
         )
-
-        # Generate the classification report
-        report = classification_report(
-            y_true, y_pred, zero_division=0, output_dict=True
+        merged = predictions.join(labels, on="key", how="inner")
+        merged["committee_json"] = (
+            merged["committee_json"].fillna("none").astype(str).str.lower()
         )
+        return merged
 
-        # Save as JSON file in the same directory
-        json_report_filename = (
-            f"evals/classification_report_{json_filename.replace('.json', '')}.json"
-        )
-        with open(json_report_filename, "w") as f:
+    def align(self, df_json):
+        """
+        Inner-join predictions to the ground truth on the merge key.
+        Returns the expected and predicted committee names, lower-cased.
+        """
+        merged = self.merge(df_json, self.labels)
+        return merged["committee_csv"], merged["committee_json"]
+
+    def align_hybrid(self, df_json, threshold):
+        """
+        Like align, but scoring the hybrid pipeline: wherever the rule-based
+        disclaimer parser reaches `threshold` confidence its answer replaces
+        the model's. Also returns a mask of the rows the parser answered.
+        """
+        if self.rule_labels is None:
+            # Parsed once per ground truth, however many files are scored
+            parsed = [extract_committee(body) for body in self.bodies]
+            self.rule_labels = self.labels.assign(
+                committee_rules=[
+                    (committee or "none").lower() for committee, _ in parsed
+                ],
+                rule_confidence=[confidence for _, confidence in parsed],
+            )
+        merged = self.merge(df_json, self.rule_labels)
+        by_rules = merged["rule_confidence"] >= threshold
+        y_pred = merged["committee_json"].where(~by_rules, merged["committee_rules"])
+        return merged["committee_csv"], y_pred, by_rules
+
+
+def score_predictions(json_filename, df_json, truth, threshold=None):
+    """
+    Score one model's predictions against the prepared ground truth, or the
+    hybrid rules-then-model pipeline if a fast-path `threshold` is given.
+    Returns the summary row and the classification report.
+    """
+    if threshold is None:
+        y_true, y_pred = truth.align(df_json)
+    else:
+        y_true, y_pred, by_rules = truth.align_hybrid(df_json, threshold)
+
+    # Calculate the statistics
+    num_records = len(y_true)
+    precision, recall, f1, *_ = precision_recall_fscore_support(
+        y_true, y_pred, average="macro", zero_division=0
+    )
+    accuracy = accuracy_score(y_true, y_pred)
+
+    summary = {
+        "JSON Filename": json_filename,
+        "Total Records": num_records,
+        "Committee Matches": int((y_true.to_numpy() == y_pred.to_numpy()).sum()),
+        "Accuracy": accuracy,
+        "Precision": precision,
+        "Recall": recall,
+        "F1 Score": f1,
+    }
+    if threshold is not None:
+        # The share of emails that would not need a model call
+        summary["Rule Share"] = by_rules.mean() if len(by_rules) else 0.0
+
+    # Generate the classification report
+    report = classification_report(y_true, y_pred, zero_division=0, output_dict=True)
+
+    return summary, report
+
+
+def score_file(json_file_path, truth):
+    """
+    Load one model output file and score it against the ground truth.
+    """
+    records = load_records(json_file_path, fields=merge_columns + ["committee"])
+    df_json = pd.DataFrame(records)
+    return score_predictions(os.path.basename(json_file_path), df_json, truth)
+
+
+# Ground truth for the current worker process, built once by init_worker
+worker_truth = None
+
+
+def init_worker(path):
+    global worker_truth
+    worker_truth = GroundTruth.from_csv(path)
+
+
+def score_in_worker(json_file_path):
+    """
+    Score a file against this worker's ground truth, timing the call.
+    """
+    start = time.perf_counter()
+    summary, report = score_file(json_file_path, worker_truth)
+    return summary, report, time.perf_counter() - start
+
+
+def main(force=False, workers=1):
+    # Make sure the evals directory exists
+    os.makedirs(evals_directory, exist_ok=True)
+
+    manifest = load_manifest(manifest_file)
+    training_hash = file_hash(csv_file)
+    if manifest["training"] != training_hash:
+        # The ground truth changed, so no cached score is valid
+        manifest = {"training": training_hash, "files": {}}
+
+    # Sort so the summary comes out in the same order however files are scored
+    json_filenames = sorted(
+        name for name in os.listdir(json_directory) if name.endswith(".json")
+    )
+
+    summaries = {}
+    fingerprints = {}
+    pending = []
+    for json_filename in json_filenames:
+        json_file_path = os.path.join(json_directory, json_filename)
+
+        previous = manifest["files"].get(json_filename)
+        fingerprint = file_fingerprint(json_file_path, previous)
+        if (
+            not force
+            and previous
+            and previous["sha256"] == fingerprint["sha256"]
+            and os.path.exists(report_path(json_filename))
+        ):
+            previous.update(fingerprint)
+            summaries[json_filename] = previous["summary"]
+        else:
+            fingerprints[json_filename] = fingerprint
+            pending.append(json_file_path)
+
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=init_worker, initargs=(csv_file,)
+        ) as pool:
+            results = pool.map(score_in_worker, pending)
+            scored = list(results)
+    elif pending:
+        init_worker(csv_file)
+        scored = [score_in_worker(path) for path in pending]
+    else:
+        scored = []
+
+    for summary, report, elapsed in scored:
+        json_filename = summary["JSON Filename"]
+        print(f"Scored {json_filename} in {elapsed:.3f}s")
+        summaries[json_filename] = summary
+
+        # Save as JSON file in the evals directory
+        with open(report_path(json_filename), "w") as f:
+            json.dump(report, f, indent=4)
+
+        manifest["files"][json_filename] = fingerprints[json_filename] | {
+            "summary": summary
+        }
+
+    # Forget files that are no longer present
+    manifest["files"] = {
+        name: entry for name, entry in manifest["files"].items() if name in summaries
+    }
+    with open(manifest_file, "w") as f:
+        json.dump(manifest, f, indent=4)
+
+    print(
+        f"Scored {len(scored)} files, reused {len(summaries) - len(scored)} unchanged files"
+    )
+    write_summary([summaries[name] for name in json_filenames])
+
+
+def main_store(store):
+    """
+    Score every model in the columnar results store. Loading predictions from
+    the store is cheap, so every model is re-scored and no manifest is kept.
+    """
+    os.makedirs(evals_directory, exist_ok=True)
+    truth = GroundTruth.from_csv(csv_file)
+
+    start = time.perf_counter()
+    frames = load_model_frames(store, fields=merge_columns + ["committee"])
+    print(
+        f"Loaded {len(frames)} models from {store} in {time.perf_counter() - start:.3f}s"
+    )
+
+    summary_data = []
+    for json_filename, df_json in frames.items():
+        start = time.perf_counter()
+        summary, report = score_predictions(json_filename, df_json, truth)
+        print(f"Scored {json_filename} in {time.perf_counter() - start:.3f}s")
+        summary_data.append(summary)
+
+        with open(report_path(json_filename), "w") as f:
             json.dump(report, f, indent=4)
 
+    write_summary(summary_data)
+
+
+def main_hybrid(threshold, store=None):
+    """
+    Score every model as the second stage of a hybrid pipeline, where emails
+    the rule-based parser reads with at least `threshold` confidence never
+    reach the model, next to the parser on its own. Writes
+    summary_hybrid_json.csv and leaves the per-model reports alone.
+    """
+    df_csv = pd.read_csv(csv_file)
+    truth = GroundTruth(df_csv)
+    fields = merge_columns + ["committee"]
+
+    if store:
+        frames = load_model_frames(store, fields=fields)
+    else:
+        frames = {
+            name: pd.DataFrame(
+                load_records(os.path.join(json_directory, name), fields=fields)
+            )
+            for name in sorted(os.listdir(json_directory))
+            if name.endswith(".json")
+        }
+
+    # At threshold 0 the parser answers every email
+    summary, _ = score_predictions("rules_only", df_csv, truth, threshold=0.0)
+    summary_data = [summary]
+    for json_filename, df_json in frames.items():
+        summary, _ = score_predictions(json_filename, df_json, truth, threshold)
+        summary_data.append(summary)
+
+    summary_df = pd.DataFrame(summary_data)
+    output_file = os.path.join(base_directory, "summary_hybrid_json.csv")
+    summary_df.to_csv(output_file, index=False)
+    print(f"Rules alone: accuracy {summary_data[0]['Accuracy']:.3f}")
+    print(f"Hybrid summary saved to {output_file}")
+
+
+def write_summary(summary_data):
+    # Create a summary DataFrame and save to a CSV file
+    summary_df = pd.DataFrame(summary_data)
+    output_file = os.path.join(base_directory, "summary_all_json.csv")
+    summary_df.to_csv(output_file, index=False)
+    print(f"Summary saved to {output_file}")
+
+    summary_df.to_csv(
+        os.path.join(evals_directory, "model_performance_summary.csv"), index=False
+    )
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score model output files against the training data"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-score every file, ignoring the manifest",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to score files with",
+    )
+    parser.add_argument(
+        "--store",
+        help="Score predictions from a results store directory instead of JSON files",
+    )
+    parser.add_argument(
+        "--hybrid",
+        type=float,
+        nargs="?",
+        const=DEFAULT_THRESHOLD,
+        metavar="THRESHOLD",
+        help="Score the rules-then-model pipeline, resolving emails the "
+        "disclaimer parser reads with at least this confidence without the "
+        f"model (default {DEFAULT_THRESHOLD})",
+    )
+    args = parser.parse_args(argv)
+    if args.hybrid is not None:
+        main_hybrid(args.hybrid, args.store)
+    elif args.store:
+        main_store(args.store)
+    else:
+        main(force=args.force, workers=args.workers)
 
-# Create a summary DataFrame and save to a CSV file
-summary_df = pd.DataFrame(summary_data)
-output_file = "summary_all_json.csv"
-summary_df.to_csv(output_file, index=False)
-print(f"Summary saved to {output_file}")
 
-scores_df = pd.DataFrame(model_scores)
-scores_df.to_csv("evals/model_performance_summary.csv", index=False)
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,216 @@
+import asyncio
+import time
+
+import httpx
+from ollama import AsyncClient, ResponseError
+
+# Weight of the newest call in an endpoint's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+
+def is_endpoint_error(error):
+    """
+    Whether an error means the endpoint, rather than the request, is at fault:
+    it could not be reached, dropped the connection or failed internally.
+    """
+    if isinstance(error, ResponseError):
+        return error.status_code >= 500
+    # The ollama client reports refused connections as ConnectionError
+    return isinstance(error, (ConnectionError, httpx.TransportError))
+
+
+class Endpoint:
+    """
+    One Ollama host with its client, the requests in flight on it and a
+    moving average of how long its requests take.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.client = AsyncClient(host=host)
+        self.in_flight = 0
+        self.latency = None
+        self.requests = 0
+        self.failures = 0
+        self.healthy = True
+        self.retry_at = 0.0
+
+    def __repr__(self):
+        return self.host
+
+    def load(self, prior=0.0):
+        """
+        Expected wait for a new request: the average latency scaled by the
+        requests already in flight. Endpoints without a measurement yet are
+        assumed to take `prior` seconds.
+        """
+        latency = self.latency if self.latency is not None else prior
+        return latency * (self.in_flight + 1)
+
+    def available(self):
+        # An unhealthy endpoint gets a request again once its backoff ends
+        return self.healthy or time.monotonic() >= self.retry_at
+
+    def succeeded(self, seconds):
+        self.requests += 1
+        self.failures = 0
+        self.healthy = True
+        self.observe(seconds)
+
+    def observe(self, seconds):
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += LATENCY_SMOOTHING * (seconds - self.latency)
+
+    def failed(self, cooldown, max_cooldown):
+        self.failures += 1
+        self.healthy = False
+        delay = min(cooldown * 2 ** (self.failures - 1), max_cooldown)
+        self.retry_at = time.monotonic() + delay
+
+
+class OllamaPool:
+    """
+    Client-side load balancer over several Ollama endpoints.
+
+    Stands in for an AsyncClient: each chat() goes to the available endpoint
+    with the lowest load (moving average latency times requests in flight,
+    plus one), and among equal loads to the one with the fewest requests in
+    flight. Endpoints not measured yet count as the pool's average latency,
+    so the first requests spread out rather than all going to one. If the
+    endpoint cannot be reached or fails, the request moves on to the next
+    one, and the failed endpoint is held back with exponential backoff until
+    a request or health check finds it working again. A request the caller
+    gives up on counts the time it waited toward its endpoint's latency.
+    """
+
+    def __init__(self, hosts, health_interval=30.0, health_timeout=5.0, cooldown=5.0):
+        self.endpoints = [Endpoint(host) for host in hosts]
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.cooldown = cooldown
+        self.max_cooldown = max(cooldown, health_interval)
+        self.health_task = None
+
+    def pick(self, tried=()):
+        candidates = [
+            endpoint
+            for endpoint in self.endpoints
+            if endpoint not in tried and endpoint.available()
+        ]
+        if not candidates:
+            return None
+        measured = [e.latency for e in self.endpoints if e.latency is not None]
+        prior = sum(measured) / len(measured) if measured else 0.0
+        return min(candidates, key=lambda e: (e.load(prior), e.in_flight))
+
+    async def chat(self, **kwargs):
+        """
+        Send a chat request to the least loaded endpoint, failing over to
+        the others. Raises the last endpoint's error if none of them can
+        serve it.
+        """
+        self.start_health_checks()
+        tried = set()
+        error = None
+        while (endpoint := self.pick(tried)) is not None:
+            tried.add(endpoint)
+            endpoint.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await endpoint.client.chat(**kwargs)
+                if kwargs.get("stream"):
+                    # The request is only made once the stream is read, so
+                    # read its first chunk here where failover can happen
+                    first = await anext(response)
+                    return self.relay(endpoint, response, first, start)
+            except BaseException as e:
+                endpoint.in_flight -= 1
+                if isinstance(e, asyncio.CancelledError):
+                    # Usually the caller's timeout. The time waited so far is
+                    # a lower bound on this endpoint's latency, so a hung or
+                    # overloaded one stops looking fast and loses its share
+                    endpoint.observe(time.perf_counter() - start)
+                    raise
+                if not is_endpoint_error(e):
+                    raise
+                endpoint.failed(self.cooldown, self.max_cooldown)
+                print(f"Ollama endpoint {endpoint} failed, failing over: {e!r}")
+                error = e
+                continue
+            endpoint.in_flight -= 1
+            endpoint.succeeded(time.perf_counter() - start)
+            return response
+
+        raise error or ConnectionError("No Ollama endpoint is available")
+
+    async def relay(self, endpoint, chunks, first, start):
+        """
+        Yield a stream's chunks, keeping the request counted as in flight on
+        its endpoint until the stream ends or is closed.
+        """
+        failed = False
+        try:
+            yield first
+            async for chunk in chunks:
+                yield chunk
+        except Exception as e:
+            if is_endpoint_error(e):
+                failed = True
+                endpoint.failed(self.cooldown, self.max_cooldown)
+            raise
+        finally:
+            endpoint.in_flight -= 1
+            await chunks.aclose()
+            if not failed:
+                endpoint.succeeded(time.perf_counter() - start)
+
+    def start_health_checks(self):
+        if self.health_task is None and self.health_interval:
+            self.health_task = asyncio.create_task(self.check_health_forever())
+
+    async def check_health(self):
+        """
+        Ping every endpoint, marking the ones that answer healthy and the
+        ones that do not as failed.
+        """
+
+        async def check(endpoint):
+            try:
+                await asyncio.wait_for(endpoint.client.list(), self.health_timeout)
+            except Exception:
+                if endpoint.healthy:
+                    print(f"Ollama endpoint {endpoint} failed its health check")
+                endpoint.failed(self.cooldown, self.max_cooldown)
+            else:
+                if not endpoint.healthy:
+                    print(f"Ollama endpoint {endpoint} is back")
+                endpoint.failures = 0
+                endpoint.healthy = True
+
+        await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+
+    async def check_health_forever(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_health()
+
+    async def close(self):
+        if self.health_task is not None:
+            self.health_task.cancel()
+            await asyncio.gather(self.health_task, return_exceptions=True)
+            self.health_task = None
+
+    def stats(self):
+        """
+        Requests served, average latency and state of each endpoint.
+        """
+        return {
+            endpoint.host: {
+                "requests": endpoint.requests,
+                "latency": round(endpoint.latency, 3) if endpoint.latency else None,
+                "healthy": endpoint.healthy,
+            }
+            for endpoint in self.endpoints
+        }
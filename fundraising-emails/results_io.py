@@ -0,0 +1,200 @@
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional, faster backend
+    orjson = None
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def loads(data):
+    """
+    Parse a JSON document with orjson when it is installed, else the stdlib.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def drop_partial_line(path):
+    """
+    Truncate a file after its last newline, removing a line left half-written
+    by a crash so that appended lines start on a line of their own.
+    """
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        position = size
+        while position > 0:
+            start = max(0, position - CHUNK_SIZE)
+            f.seek(start)
+            chunk = f.read(position - start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+
+class JsonlWriter:
+    """
+    Append-only JSON Lines writer.
+
+    Every record is written and flushed as soon as it arrives, so nothing is
+    held in memory. The file is fsynced every `fsync_every` records and on
+    close, which bounds how much a hard crash can lose without paying for an
+    fsync per record. A line left half-written by a crash is dropped before
+    appending, so the next record does not run into it.
+    """
+
+    def __init__(self, path, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.pending = 0
+        if os.path.exists(path):
+            drop_partial_line(path)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(path):
+    """
+    Yield records from a JSON Lines file, skipping a truncated final line
+    left behind by a crash mid-write.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
+
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the elements of a top-level JSON array one at a time, reading the
+    file in chunks, so only the current record is ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos = 1
+        eof = False
+
+        while True:
+            # Skip whitespace and separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Buffer exhausted", buffer, pos)
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # The next element runs past the buffer; read more and retry
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
+
+
+def iter_records(path, fields=None):
+    """
+    Yield records from a model output file, either a JSON array (.json) or
+    JSON Lines (.jsonl).
+
+    With `fields`, each record is reduced to just those keys as it is read,
+    so large fields such as the email body are dropped immediately rather
+    than kept for the whole file. Keys missing from a record stay missing.
+    """
+    if path.endswith(".jsonl"):
+        records = iter_jsonl(path)
+    else:
+        records = iter_json_array(path)
+
+    if fields is None:
+        yield from records
+        return
+
+    for record in records:
+        yield project(record, fields)
+
+
+def project(record, fields):
+    return {field: record[field] for field in fields if field in record}
+
+
+def load_records(path, fields=None):
+    """
+    Load every record of a model output file as a list, keeping only `fields`.
+
+    When orjson is installed, JSON arrays are parsed in one pass with it, which
+    is faster than streaming but briefly holds the whole file in memory.
+    """
+    if orjson is not None and not path.endswith(".jsonl"):
+        try:
+            with open(path, "rb") as f:
+                records = orjson.loads(f.read())
+        except orjson.JSONDecodeError:
+            # orjson rejects lone surrogates, which some model outputs contain
+            pass
+        else:
+            if fields is None:
+                return records
+            return [project(record, fields) for record in records]
+
+    return list(iter_records(path, fields))
+
+
+def jsonl_to_json(jsonl_path, json_path):
+    """
+    Convert a JSON Lines file to the JSON array format the scoring scripts
+    read, one record at a time.
+    """
+    count = 0
+    with open(json_path, "w", encoding="utf-8") as out:
+        out.write("[")
+        for record in iter_jsonl(jsonl_path):
+            out.write(",\n" if count else "\n")
+            out.write(json.dumps(record, ensure_ascii=False))
+            count += 1
+        out.write("\n]\n")
+    return count
@@ -0,0 +1,178 @@
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+
+import pandas as pd
+from results_io import load_records
+
+base_directory = os.path.dirname(os.path.abspath(__file__))
+store_directory = os.path.join(base_directory, "results_store")
+
+# Email metadata kept once in the shared emails table
+EMAIL_COLUMNS = [
+    "name",
+    "email",
+    "subject",
+    "date",
+    "year",
+    "month",
+    "day",
+    "hour",
+    "minute",
+    "domain",
+    "party",
+    "disclaimer",
+    "body",
+]
+
+# Fields that differ between models, kept in the predictions table
+PREDICTION_COLUMNS = ["committee", "sender"]
+
+# Columns that identify an email, the same ones matcher.py joins on
+KEY_COLUMNS = ["email", "subject", "year", "month", "day", "hour", "minute", "domain"]
+
+
+def split_filename(json_filename):
+    """
+    Split a model output filename into its model and prompt version, e.g.
+    'phi4_november_2024_prompt2.json' -> ('phi4_november_2024', 'prompt2').
+    Files without a prompt suffix used the original prompt.
+    """
+    stem = os.path.basename(json_filename).replace(".json", "")
+    match = re.match(r"(.*)_(prompt\d+)$", stem)
+    if match:
+        return match.group(1), match.group(2)
+    return stem, "original"
+
+
+def email_ids(frame):
+    """
+    Derive a stable id for each email from its normalized key columns.
+    """
+    columns = [frame[col].astype(str).str.strip().str.lower() for col in KEY_COLUMNS]
+    keys = columns[0].str.cat(columns[1:], sep="\x1f")
+    return keys.map(
+        lambda key: hashlib.sha1(key.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+    )
+
+
+def clean_text(value):
+    """
+    Convert a value to text that can be written as UTF-8. Some model outputs
+    contain lone surrogates, which are replaced with U+FFFD.
+    """
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    value = str(value)
+    try:
+        value.encode("utf-8")
+    except UnicodeEncodeError:
+        value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+    return value
+
+
+def import_json_files(json_files, store=store_directory):
+    """
+    Build the store from model output JSON files: one emails table shared by
+    every model and one narrow predictions table keyed by
+    (model, prompt_version, email_id).
+    """
+    emails = []
+    predictions = []
+
+    for path in sorted(json_files):
+        json_filename = os.path.basename(path)
+        frame = pd.DataFrame(load_records(path))
+        if frame.empty:
+            continue
+        frame["email_id"] = email_ids(frame)
+        model, prompt_version = split_filename(json_filename)
+
+        prediction = pd.DataFrame(
+            {
+                "model": model,
+                "prompt_version": prompt_version,
+                "source_file": json_filename,
+                "email_id": frame["email_id"],
+            }
+        )
+        for col in PREDICTION_COLUMNS:
+            prediction[col] = (
+                frame[col].map(clean_text) if col in frame.columns else None
+            )
+        predictions.append(prediction)
+
+        columns = ["email_id"] + [col for col in EMAIL_COLUMNS if col in frame.columns]
+        emails.append(frame[columns])
+
+    emails_df = pd.concat(emails, ignore_index=True).drop_duplicates("email_id")
+    for col in EMAIL_COLUMNS:
+        if col in emails_df.columns:
+            emails_df[col] = emails_df[col].map(clean_text)
+    predictions_df = pd.concat(predictions, ignore_index=True)
+
+    os.makedirs(store, exist_ok=True)
+    emails_df.to_parquet(os.path.join(store, "emails.parquet"), index=False)
+    predictions_df.to_parquet(os.path.join(store, "predictions.parquet"), index=False)
+    return len(emails_df), len(predictions_df)
+
+
+def load_emails(store=store_directory, columns=None):
+    """
+    Load the shared emails table, optionally only some of its columns.
+    """
+    if columns is not None:
+        columns = ["email_id"] + [col for col in columns if col != "email_id"]
+    return pd.read_parquet(os.path.join(store, "emails.parquet"), columns=columns)
+
+
+def load_predictions(store=store_directory, source_files=None):
+    """
+    Load the predictions table, optionally only for some source files.
+    """
+    filters = [("source_file", "in", list(source_files))] if source_files else None
+    return pd.read_parquet(os.path.join(store, "predictions.parquet"), filters=filters)
+
+
+def load_model_frames(store=store_directory, fields=None, source_files=None):
+    """
+    Rebuild per-file prediction frames from the store, joining each prediction
+    to the email metadata it needs. Returns a dict keyed by source filename,
+    in sorted order, holding `fields` (all columns if None).
+    """
+    predictions = load_predictions(store, source_files)
+    email_fields = None
+    if fields is not None:
+        email_fields = [col for col in fields if col not in PREDICTION_COLUMNS]
+    emails = load_emails(store, email_fields)
+
+    merged = predictions.merge(emails, on="email_id", how="left", sort=False)
+    if fields is not None:
+        merged = merged[["source_file"] + [col for col in fields if col in merged]]
+
+    return {
+        source_file: frame.drop(columns="source_file").reset_index(drop=True)
+        for source_file, frame in merged.groupby("source_file", sort=True)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import model output JSON files into the columnar results store"
+    )
+    parser.add_argument(
+        "--store", default=store_directory, help="Directory to write the store to"
+    )
+    args = parser.parse_args()
+
+    json_files = glob.glob(os.path.join(base_directory, "*.json"))
+    start = time.perf_counter()
+    num_emails, num_predictions = import_json_files(json_files, args.store)
+    print(
+        f"Imported {len(json_files)} files into {args.store}: "
+        f"{num_emails} emails, {num_predictions} predictions "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
@@ -0,0 +1,138 @@
+import argparse
+import json
+import random
+import re
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the parts of the Ollama API the extraction uses (chat,
+# streamed or not, and the model list used for health checks), for exercising
+# it without a GPU. Start a few on different ports to try the endpoint pool:
+#
+#   python fundraising-emails/stub_ollama.py --port 11501 --latency 0.2
+#   python fundraising-emails/stub_ollama.py --port 11502 --latency 1.0
+#   python fundraising-emails/email_ollama.py 2024 11 pool \
+#       --host http://127.0.0.1:11501 http://127.0.0.1:11502
+
+DISCLAIMER = re.compile(r"paid for by\s+(.+?)(?:[.,\n]|$)", re.IGNORECASE)
+# Labels packing.format_pack puts before each email of a packed request
+PACK_LABEL = re.compile(r"^### Email (\d+)$", re.MULTILINE)
+
+# Seconds per reply and share of requests answered with a server error
+latency = 0.0
+fail_rate = 0.0
+
+
+def fields(text):
+    match = DISCLAIMER.search(text)
+    return {"committee": match.group(1).strip() if match else None, "sender": None}
+
+
+def fake_reply(body):
+    """
+    Extract the committee with a regex, as the JSON a model would return,
+    answering each email of a packed request separately.
+    """
+    messages = body.get("messages", [])
+    # The system prompt quotes "Paid for by" itself, so only read the emails
+    text = "\n".join(m["content"] for m in messages if m["role"] == "user")
+    prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+    parts = PACK_LABEL.split(text)
+    if len(parts) == 1:
+        answer = fields(text)
+    else:
+        answer = {
+            "results": [
+                fields(part) | {"id": int(label)}
+                for label, part in zip(parts[1::2], parts[2::2])
+            ]
+        }
+    return json.dumps(answer), prompt_tokens
+
+
+class Handler(BaseHTTPRequestHandler):
+    def send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": []})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        if self.path != "/api/chat":
+            self.send_json({"error": "not found"}, 404)
+            return
+        if random.random() < fail_rate:
+            self.send_json({"error": "model runner has unexpectedly stopped"}, 500)
+            return
+
+        reply, prompt_tokens = fake_reply(body)
+        base = {
+            "model": body.get("model"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        usage = {
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": len(reply) // 4,
+        }
+        if not body.get("stream", True):
+            time.sleep(latency)
+            message = {"role": "assistant", "content": reply}
+            self.send_json(base | {"message": message} | usage)
+            return
+
+        # Streamed as newline-delimited JSON, a few characters per chunk
+        chunks = [reply[start : start + 4] for start in range(0, len(reply), 4)]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                time.sleep(latency / len(chunks))
+                message = {"role": "assistant", "content": chunk}
+                line = base | {"message": message, "done": False}
+                self.wfile.write(json.dumps(line).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            message = {"role": "assistant", "content": ""}
+            line = base | {"message": message} | usage
+            self.wfile.write(json.dumps(line).encode("utf-8") + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped the stream once it had its answer
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Ollama stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds taken per reply"
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0.0,
+        help="Share of chat requests answered with a server error",
+    )
+    args = parser.parse_args()
+    latency = args.latency
+    fail_rate = args.fail_rate
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Serving Ollama stand-in on http://{args.host}:{args.port}")
+    server.serve_forever()
@@ -0,0 +1,132 @@
+import time
+
+# Taken before anything else is imported, so startup covers every import
+started = time.perf_counter()
+
+import argparse  # noqa: E402
+import importlib  # noqa: E402
+import os  # noqa: E402
+import runpy  # noqa: E402
+import sys  # noqa: E402
+
+root_directory = os.path.dirname(os.path.abspath(__file__))
+emails_directory = os.path.join(root_directory, "fundraising-emails")
+benchmarking_directory = os.path.join(root_directory, "benchmarking")
+
+# Subcommand -> (script directory, module, working directory or None for the
+# current one, description). A module is only imported when its subcommand
+# runs, so cheap subcommands never pay for sklearn, matplotlib or openai.
+COMMANDS = {
+    "extract": (
+        emails_directory,
+        "email_ollama",
+        None,
+        "Extract one month of emails with a local Ollama model",
+    ),
+    "jobs": (
+        emails_directory,
+        "extract_jobs",
+        None,
+        "Extract a range of months with several models, sharded",
+    ),
+    "evaluate": (
+        benchmarking_directory,
+        "evaluation",
+        root_directory,
+        "Benchmark OpenAI models on the training data",
+    ),
+    "speed": (
+        benchmarking_directory,
+        "call_metrics",
+        None,
+        "Summarize per-call latency and throughput of extraction runs",
+    ),
+    "score": (
+        emails_directory,
+        "matcher",
+        None,
+        "Score model output files against the training data",
+    ),
+    "matrix": (
+        emails_directory,
+        "make_matrix",
+        emails_directory,
+        "Combine training data and model predictions into one matrix",
+    ),
+    "leaderboard": (
+        emails_directory,
+        "generate_leaderboard",
+        root_directory,
+        "Generate the HTML leaderboard from the scoring summary",
+    ),
+    "charts": (
+        emails_directory,
+        "charts",
+        emails_directory,
+        "Draw the model performance charts from the scoring summary",
+    ),
+    "bench": (
+        emails_directory,
+        "bench_pipeline",
+        None,
+        "Benchmark the scoring and aggregation pipeline on synthetic data",
+    ),
+}
+
+
+def run_command(command, argv):
+    """
+    Import the subcommand's module and run it with `argv`. Returns its exit
+    status and the seconds spent importing it (None for charts, which runs
+    as it is imported) and running it.
+    """
+    directory, module_name, cwd, _ = COMMANDS[command]
+    # Scripts import their siblings by bare name, as when run directly
+    sys.path.insert(0, directory)
+    if cwd:
+        os.chdir(cwd)
+
+    start = time.perf_counter()
+    if module_name == "charts":
+        # charts.py draws at import time, so it has no separate import phase
+        sys.argv = [module_name, *argv]
+        runpy.run_path(os.path.join(directory, "charts.py"), run_name="__main__")
+        return 0, None, time.perf_counter() - start
+
+    module = importlib.import_module(module_name)
+    imported = time.perf_counter()
+    status = module.cli(argv)
+    return status or 0, imported - start, time.perf_counter() - imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="llm-extract",
+        description="Extraction, scoring and reporting toolchain. Options after "
+        "the subcommand are passed on to it; use '<subcommand> --help' for them.",
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="Do not report startup and run times",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True, metavar="command")
+    for name, (*_, description) in COMMANDS.items():
+        # Help is left to the subcommand's own parser
+        subparsers.add_parser(name, help=description, add_help=False)
+    args, command_argv = parser.parse_known_args(argv)
+
+    status, import_seconds, run_seconds = run_command(args.command, command_argv)
+    if not args.quiet:
+        # On stderr, so it never mixes with a subcommand's own output
+        startup = time.perf_counter() - started - run_seconds
+        report = f"llm-extract {args.command}: started in {startup:.3f}s"
+        if import_seconds is not None:
+            module_name = COMMANDS[args.command][1]
+            report += f" ({import_seconds:.3f}s importing {module_name})"
+        print(f"{report}, ran in {run_seconds:.3f}s", file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# The scripts import their siblings by bare name, as when run directly
+root = Path(__file__).resolve().parent.parent
+sys.path.append(str(root / "benchmarking"))
+sys.path.append(str(root / "fundraising-emails"))
@@ -0,0 +1,43 @@
+from email_db import check_index, iter_emails, open_database
+
+
+def make_database(path, dates):
+    db = open_database(str(path))
+    db["emails"].insert_all(
+        {
+            "subject": f"Email {i}",
+            "year": 2024,
+            "month": 11,
+            "disclaimer": "True",
+            "date": date,
+        }
+        for i, date in enumerate(dates)
+    )
+    return open_database(str(path))
+
+
+def test_null_dates_are_included(tmp_path):
+    dates = ["2024-11-03", None, "2024-11-01", None, "2024-11-02", "2024-11-01"]
+    db = make_database(tmp_path / "emails.db", dates)
+
+    subjects = [row["subject"] for row in iter_emails(db, 2024, 11, page_size=2)]
+
+    # Undated emails first, as SQLite orders NULLs, then by date and rowid
+    assert subjects == [
+        "Email 1",
+        "Email 3",
+        "Email 2",
+        "Email 5",
+        "Email 4",
+        "Email 0",
+    ]
+
+
+def test_limit_spans_undated_and_dated(tmp_path):
+    dates = [None, "2024-11-02", None, "2024-11-01"]
+    db = make_database(tmp_path / "emails.db", dates)
+
+    rows = list(iter_emails(db, 2024, 11, page_size=1, limit=3))
+
+    assert [row["subject"] for row in rows] == ["Email 0", "Email 2", "Email 3"]
+    assert "COVERING INDEX" in check_index(db)
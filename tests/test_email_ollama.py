@@ -0,0 +1,138 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+import email_ollama
+from harness import ResponseCache
+from results_io import iter_jsonl
+
+
+class FakeClient:
+    """Answers every chat with a fixed committee, failing the emails in
+    `failing`"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+
+    async def chat(self, model, format, messages, options=None):
+        body = messages[-1]["content"]
+        if body in self.failing:
+            raise ConnectionError("model unavailable")
+        content = json.dumps({"committee": "Committee", "sender": None})
+        return SimpleNamespace(
+            message=SimpleNamespace(content=content),
+            prompt_eval_count=10,
+            eval_count=5,
+            load_duration=0,
+            prompt_eval_duration=0,
+        )
+
+
+def test_resume_retries_failed_emails(tmp_path, monkeypatch):
+    emails = [{"id": i, "subject": f"Email {i}", "body": f"body {i}"} for i in range(3)]
+    entities_file = str(tmp_path / "entities.jsonl")
+    failures_file = str(tmp_path / "failures.jsonl")
+
+    def run(client):
+        monkeypatch.setattr(email_ollama, "make_client", lambda host: client)
+        return asyncio.run(
+            email_ollama.run_extraction(
+                emails, entities_file, failures_file, retries=0, compact=True
+            )
+        )
+
+    assert run(FakeClient(failing={"body 1"})) == 3
+    assert [record["id"] for record in iter_jsonl(failures_file)] == [1]
+
+    # Only the failed email is sent again
+    assert run(FakeClient()) == 1
+    assert sorted(record["id"] for record in iter_jsonl(entities_file)) == [0, 1, 2]
+    assert list(iter_jsonl(failures_file)) == []
+
+
+class FlakyClient(FakeClient):
+    """Sends one invalid reply for each email before the real one"""
+
+    def __init__(self, failing=()):
+        super().__init__(failing)
+        self.seen = set()
+
+    async def chat(self, model, format, messages, options=None):
+        body = messages[-1]["content"]
+        if body not in self.seen:
+            self.seen.add(body)
+            return SimpleNamespace(
+                message=SimpleNamespace(content="not json"),
+                prompt_eval_count=10,
+                eval_count=5,
+                load_duration=0,
+                prompt_eval_duration=0,
+            )
+        return await super().chat(model, format, messages, options)
+
+
+def test_one_metrics_row_per_email():
+    client = FlakyClient(failing={"body 2"})
+    rows = []
+    metrics = SimpleNamespace(write=rows.append)
+
+    async def run():
+        for i in range(3):
+            email = {"id": i, "body": f"body {i}"}
+            await email_ollama.process_email(
+                client, email, retries=1, backoff=0, metrics=metrics
+            )
+
+    asyncio.run(run())
+
+    # A retried reply and a failed email each still give a single row
+    assert [(row["id"], row["outcome"], row["retries"]) for row in rows] == [
+        (0, "ok", 1),
+        (1, "ok", 1),
+        (2, "failed", 1),
+    ]
+
+
+class PackClient(FakeClient):
+    """Answers packed requests too, counting every request"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = 0
+
+    async def chat(self, model, format, messages, options=None):
+        self.requests += 1
+        body = messages[-1]["content"]
+        labels = re.findall(r"^### Email (\d+)$", body, re.MULTILINE)
+        if not labels:
+            return await super().chat(model, format, messages, options)
+        results = [
+            {"id": int(label), "committee": "Packed", "sender": None}
+            for label in labels
+        ]
+        return SimpleNamespace(
+            message=SimpleNamespace(content=json.dumps({"results": results})),
+            prompt_eval_count=10,
+            eval_count=5,
+        )
+
+
+def test_packed_answers_are_cached_apart(tmp_path):
+    emails = [{"id": i, "body": f"body {i}"} for i in range(3)]
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    client = PackClient()
+
+    async def run():
+        packed = await email_ollama.process_pack(client, emails, cache=cache)
+        again = await email_ollama.process_pack(client, emails, cache=cache)
+        single = await email_ollama.process_email(client, emails[0], cache=cache)
+        return packed, again, single
+
+    packed, again, single = asyncio.run(run())
+    cache.close()
+
+    assert packed == again == [{"committee": "Packed", "sender": None}] * 3
+    # The repeated pack came from the cache; the single email did not
+    assert client.requests == 2
+    assert single == {"committee": "Committee", "sender": None}
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+import make_matrix
+
+
+def test_store_null_committees_are_not_counted(monkeypatch):
+    frame = pd.DataFrame(
+        {
+            "subject": ["A", "B"],
+            "date": ["2024-11-01", "2024-11-02"],
+            "name": ["Ann", "Bob"],
+            "committee": ["Friends of Ann", np.nan],
+        }
+    )
+    monkeypatch.setattr(
+        make_matrix,
+        "load_model_frames",
+        lambda store, fields: {"test_model_november_2024_prompt2.json": frame},
+    )
+    data = make_matrix.load_store_predictions("store")
+    assert data["test_model"][1]["committee"] is None
+
+    training = pd.DataFrame(
+        {
+            "name": ["Ann", "Bob"],
+            "email": ["ann@example.com", "bob@example.com"],
+            "subject": ["A", "B"],
+            "date": ["2024-11-01", "2024-11-02"],
+            "year": [2024, 2024],
+            "month": [11, 11],
+            "day": [1, 2],
+            "hour": [9, 9],
+            "minute": [0, 0],
+            "domain": ["example.com", "example.com"],
+            "party": ["D", "R"],
+            "disclaimer": [True, True],
+            "committee": ["Friends of Ann", None],
+        }
+    )
+    df = make_matrix.create_combined_dataframe(training, data)
+
+    assert df["test_model"].tolist() == ["FRIENDS OF ANN", None]
+    assert df["model_count"].tolist() == [1, 0]
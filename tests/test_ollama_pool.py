@@ -0,0 +1,76 @@
+import asyncio
+from collections import Counter
+
+from ollama_pool import OllamaPool
+
+
+class SlowClient:
+    """Holds every chat until `release` is set, recording where it went"""
+
+    def __init__(self, host, release, served):
+        self.host = host
+        self.release = release
+        self.served = served
+
+    async def chat(self, **kwargs):
+        self.served[self.host] += 1
+        await self.release.wait()
+        return {"host": self.host}
+
+
+def test_first_wave_spreads_across_endpoints():
+    async def run():
+        pool = OllamaPool(["a", "b", "c"], health_interval=0)
+        release = asyncio.Event()
+        served = Counter()
+        for endpoint in pool.endpoints:
+            endpoint.client = SlowClient(endpoint.host, release, served)
+
+        tasks = [asyncio.create_task(pool.chat(model="m")) for _ in range(8)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*tasks)
+        return served
+
+    assert sorted(asyncio.run(run()).values()) == [2, 3, 3]
+
+
+def test_unmeasured_endpoint_counts_as_average():
+    pool = OllamaPool(["a", "b"], health_interval=0)
+    fast, new = pool.endpoints
+    fast.succeeded(1.0)
+    fast.in_flight = 1
+
+    # An endpoint with no latency yet no longer draws every request
+    new.in_flight = 3
+    assert pool.pick() is fast
+
+
+class HungClient:
+    """Accepts requests and never answers"""
+
+    async def chat(self, **kwargs):
+        await asyncio.Event().wait()
+
+
+def test_timed_out_requests_count_toward_latency():
+    async def run():
+        pool = OllamaPool(["hung", "ok"], health_interval=0)
+        hung, ok = pool.endpoints
+        hung.succeeded(0.1)
+        ok.succeeded(0.2)
+        hung.client = HungClient()
+
+        # The hung endpoint looks fastest, so it gets the request
+        assert pool.pick() is hung
+        try:
+            await asyncio.wait_for(pool.chat(model="m"), timeout=1.0)
+        except TimeoutError:
+            pass
+        return pool
+
+    pool = asyncio.run(run())
+    hung, ok = pool.endpoints
+    assert hung.in_flight == 0
+    assert hung.latency > ok.latency
+    assert pool.pick() is ok
@@ -0,0 +1,34 @@
+import json
+
+from results_io import JsonlWriter, iter_jsonl, jsonl_to_json
+
+
+def test_resume_after_partial_line(tmp_path):
+    path = tmp_path / "entities.jsonl"
+    with JsonlWriter(path) as writer:
+        writer.write({"id": 1})
+    # A crash part-way through writing the second record
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": 2, "comm')
+
+    with JsonlWriter(path) as writer:
+        writer.write({"id": 2})
+        writer.write({"id": 3})
+
+    assert [record["id"] for record in iter_jsonl(path)] == [1, 2, 3]
+
+
+def test_jsonl_to_json(tmp_path):
+    path = tmp_path / "entities.jsonl"
+    with JsonlWriter(path) as writer:
+        writer.write({"id": 1, "committee": "A"})
+        writer.write({"id": 2, "committee": None})
+
+    count = jsonl_to_json(path, tmp_path / "entities.json")
+
+    assert count == 2
+    with open(tmp_path / "entities.json", encoding="utf-8") as f:
+        assert json.load(f) == [
+            {"id": 1, "committee": "A"},
+            {"id": 2, "committee": None},
+        ]
@@ -0,0 +1,22 @@
+from results_log import ResultsLog, canonical
+
+
+def test_canonical_numbers():
+    assert canonical(0) == canonical(0.0) == canonical("0.0") == "0"
+    assert canonical(0.8) == canonical("0.8") == "0.8"
+    assert canonical("gpt-4.1-nano") == "gpt-4.1-nano"
+    assert canonical("") == ""
+
+
+def test_resume_matches_equivalent_values(tmp_path):
+    path = tmp_path / "inferences.csv"
+    columns = ["model", "fast_path", "token_budget", "committee"]
+    key_columns = ["model", "fast_path", "token_budget"]
+    with ResultsLog(path, columns, key_columns) as log:
+        # As written by a run given --fast-path 0
+        log.write({"model": "m", "fast_path": 0.0, "token_budget": 0})
+
+    with ResultsLog(path, columns, key_columns, resume=True) as log:
+        # The default threshold is the integer 0
+        assert ("m", 0, 0) in log
+        assert ("m", 0.8, 0) not in log